@@ -0,0 +1,475 @@
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+import argparse
+import casestore
+import chunker
+import embedders
+import fakegemini
+import hashlib
+import json
+import llmcache
+import llmcalls
+import matcher
+import multiprocessing
+import numpy as np
+import os
+import platform
+import promptpack
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import ttscache
+import urllib.error
+import urllib.request
+import vectorsearch
+import zipfile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Reproducible benchmark of every stage of the matching / summarization pipeline.
+#   python benchmark.py --sizes 10,1000,10000 --output bench_results.json
+#   python benchmark.py --sizes 1000 --compare bench_results.json
+#   python benchmark.py --sizes "" --startup      time to ready of every entry point
+# Corpora are synthetic but use the layout of the bundled Case*.docx files
+# (and cases_10.docx for the single-file format); everything runs locally, with
+# stand-ins for Gemini and gTTS whose latency is configurable.
+
+SECTIONS = ["Cover Page", "Case Summary", "Facts of the Case", "Legal Issues Raised", "Arguments by Petitioner",
+            "Arguments by Respondent", "Relevant Laws/Sections", "Judgment Summary", "Citations/References", "Legal Analysis"]
+CASE_TYPES = ["Criminal - IPC 302 (Murder), 34 (Common Intention)", "Civil - Breach of Contract, Consumer Protection",
+              "Family - Section 13 HMA, Cruelty, Maintenance", "Criminal - IPC 376 (Rape), 506 (Criminal Intimidation)",
+              "Tort - Medical Negligence, Consumer Law", "Constitutional - Article 14, 21, Arbitrary Suspension",
+              "Labor - Unlawful Termination, ID Act, Gratuity Act", "Media/IP - Copyright, Defamation"]
+FIRST = ["Neha", "Rahul", "Meena", "Rajiv", "Ali", "Maya", "Sharif", "Roy", "Radha", "Kumar", "Manu", "Kiran", "Priya",
+         "Arjun", "Vikram", "Sunita", "Anil", "Deepa", "Farhan", "Gita", "Lal", "Suresh", "Kavya", "Imran", "Pooja"]
+LAST = ["Sharma", "Verma", "Kapoor", "Iyer", "Khan", "Reddy", "Das", "Nair", "Patel", "Singh", "Gupta", "Bose", "Menon"]
+PARTIES = ["State", "Union of India", "Reliance Bank", "MetroCorp Ltd.", "State Hospital", "Regional Transport Office",
+           "Election Commission", "IndiaTech Pvt. Ltd.", "NewsNow Media", "Municipal Corporation"]
+SECTION_LINES = ["IPC §498A, §406", "IT Act §66C, §66D; IPC §420", "IPC §436, §498A", "IPC §323, §506", "IPC §302, §34"]
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit dowry harassment marriage property dispute "
+         "negligence hospital contract bank termination gratuity copyright defamation election suspension "
+         "murder intention assault fraud cheating evidence witness appeal bail custody").split()
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                 '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                 '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                 '<Default Extension="xml" ContentType="application/xml"/>'
+                 '<Override PartName="/word/document.xml" '
+                 'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+ROOT_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+             '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+             '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+             'Target="word/document.xml"/></Relationships>')
+
+
+#a minimal .docx with one paragraph per string ("\n" becomes a line break, as in the bundled files)
+def write_docx(path, paragraphs):
+    body = []
+    for text in paragraphs:
+        runs = '<w:r><w:br/></w:r>'.join(f'<w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r>' for line in text.split("\n"))
+        body.append(f"<w:p>{runs}</w:p>")
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{W_NS}"><w:body>'
+                + "".join(body) + "</w:body></w:document>")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", ROOT_RELS)
+        archive.writestr("word/document.xml", document)
+
+
+def random_title(rng):
+    client = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    other = rng.choice(PARTIES) if rng.random() < 0.6 else f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    return (client, other) if rng.random() < 0.7 else (other, client)
+
+
+def lorem(rng, words, lines=6):
+    per_line = max(1, words // lines)
+    return "\n".join(" ".join(rng.choice(WORDS) for _ in range(per_line)).capitalize() + "." for _ in range(lines))
+
+
+# Case<N>_*.docx files laid out like the bundled ones, plus an all_cases.docx in the cases_10.docx format
+def generate_corpus(folder, size, words_per_section=120, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    combined = []
+    for i in range(1, size + 1):
+        left, right = random_title(rng)
+        year = rng.randint(1995, 2024)
+        title = f"{left} v. {right}"
+        case_type = rng.choice(CASE_TYPES)
+        paragraphs = []
+        for section in SECTIONS:
+            paragraphs += [section, f'{section} for the case "{title}".\nCase Type: {case_type}.\n', lorem(rng, words_per_section)]
+        write_docx(os.path.join(folder, f"Case{i}_{left.split()[0]}_v_{right.split()[0]}.docx"), paragraphs)
+        combined += [f"{title} ({year})", f"Summary: {lorem(rng, 12, 1)}", f"Section(s): {rng.choice(SECTION_LINES)}"]
+    write_docx(os.path.join(folder, "all_cases.docx"), combined)
+
+
+class HashEmbedder:
+    """Deterministic bag-of-words embedder used when sentence-transformers is not installed."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i, int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % self.dim] += 1.0
+        return out
+
+
+def make_embedder(name):
+    if name == "hash":
+        return HashEmbedder()
+    if name in embedders.BACKENDS:
+        return embedders.make_embedder(name)
+    return embedders.make_embedder(model_name=name)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def summarize(durations, items=None):
+    durations = np.asarray(durations, dtype=np.float64)
+    total = float(durations.sum())
+    items = len(durations) if items is None else items
+    return {
+        "count": len(durations),
+        "mean_ms": float(durations.mean() * 1000),
+        "p50_ms": float(np.percentile(durations, 50) * 1000),
+        "p95_ms": float(np.percentile(durations, 95) * 1000),
+        "p99_ms": float(np.percentile(durations, 99) * 1000),
+        "throughput_per_s": items / total if total > 0 else None,
+    }
+
+
+#peak resident memory of this process so far, or None where it can't be read
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    peak = getattr(psutil.Process().memory_info(), "peak_wset", None)  # Windows
+    return peak / (1024 * 1024) if peak is not None else None
+
+
+def format_mb(mb):
+    return "unavailable" if mb is None else f"{mb:.0f} MB"
+
+
+def typo(rng, name):
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    return name[:i] + name[i + 1:]
+
+
+def run_size(size, args, workdir):
+    rng = random.Random(size)
+    folder = os.path.join(workdir, f"corpus_{size}")
+    if not os.path.exists(os.path.join(folder, "all_cases.docx")):
+        print(f"[{size}] generating corpus...", file=sys.stderr)
+        generate_corpus(folder, size, args.words)
+    files = sorted(os.path.join(folder, name) for name in os.listdir(folder) if casestore.is_case_file(name))
+    stages = {}
+
+    # docx parse, per file
+    print(f"[{size}] parsing {len(files)} files...", file=sys.stderr)
+    for extractor in args.extractors:
+        durations, cases = [], []
+        for path in files:
+            elapsed, case = timed(casestore.parse_case_file, path, extractor)
+            durations.append(elapsed)
+            cases.append(case)
+        stages[f"docx_parse[{extractor}]"] = summarize(durations)
+    cases = [case for case in cases if case]
+    elapsed, paragraphs = timed(lambda: list(casestore.read_paragraphs(os.path.join(folder, "all_cases.docx"))))
+    stages["docx_parse_combined"] = summarize([elapsed], items=len(paragraphs))
+
+    # embedding: client names and chunks, in the batches the indexes use
+    embedder = make_embedder(args.embedder)
+    client_names = [case["client"] for case in cases]
+    chunk_texts = [f"{case['client']}: {chunk}" for case in cases for chunk in chunker.split_chunks(case["summaries"])]
+    print(f"[{size}] embedding {len(client_names)} names and {len(chunk_texts)} chunks...", file=sys.stderr)
+    durations, vectors = [], []
+    for start in range(0, len(chunk_texts), args.batch_size):
+        elapsed, batch = timed(embedder.encode, chunk_texts[start:start + args.batch_size], batch_size=args.batch_size)
+        durations.append(elapsed)
+        vectors.append(batch)
+    stages["embed_chunks_batch"] = summarize(durations, items=len(chunk_texts))
+    chunk_vectors = np.concatenate(vectors)
+    chunk_vectors /= np.maximum(np.linalg.norm(chunk_vectors, axis=1, keepdims=True), 1e-12)
+    elapsed, name_vectors = timed(embedder.encode, client_names, batch_size=args.batch_size)
+    stages["embed_names"] = summarize([elapsed], items=len(client_names))
+
+    queries = [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(args.queries)]
+    durations = [timed(embedder.encode, [query])[0] for query in queries]
+    stages["embed_query"] = summarize(durations)
+    query_vectors = embedder.encode(queries)
+    query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+
+    # semantic search, exact and (for bigger corpora) IVF
+    searchers = {"exact": vectorsearch.ExactSearch(chunk_vectors)}
+    if len(chunk_vectors) >= 1000:
+        elapsed, searchers["ivf"] = timed(vectorsearch.IVFSearch, chunk_vectors)
+        stages["ivf_build"] = summarize([elapsed], items=len(chunk_vectors))
+    for backend, searcher in searchers.items():
+        durations = [timed(searcher.search, q, 24)[0] for q in query_vectors]
+        stages[f"semantic_search[{backend}]"] = summarize(durations)
+    if "ivf" in searchers:
+        stages["ivf_recall_at_10"] = vectorsearch.recall_at_k(searchers["ivf"], searchers["exact"], query_vectors[:50], 10)
+
+    # fuzzy name search with one-character typos
+    elapsed, fuzzy_names = timed(matcher.FuzzyNameIndex, client_names)
+    stages["fuzzy_index_build"] = summarize([elapsed], items=len(client_names))
+    name_queries = [typo(rng, rng.choice(client_names).split(" v. ")[0].split('"')[-1]) for _ in range(args.queries)]
+    durations = [timed(fuzzy_names.best, q, matcher.FUZZY_THRESHOLD)[0] for q in name_queries]
+    stages["fuzzy_search"] = summarize(durations)
+
+    # Gemini: the three concurrent case_assistant calls against the fake client
+    gemini = fakegemini.FakeGemini(latency=args.gemini_latency, jitter=args.gemini_latency / 4, seed=size)
+    durations = []
+    for i in range(args.llm_requests):
+        summary = cases[i % len(cases)]["summaries"][:2000]
+        # unique prompts so the reply cache never answers
+        prompts = {key: f"[{size}-{i}] {key}:\n\n{summary}" for key in ("simplified", "suggestions", "answer")}
+        durations.append(timed(llmcalls.run_prompts, gemini, prompts, {key: "" for key in prompts})[0])
+    stages["gemini_case_assistant"] = summarize(durations)
+
+    # query mode: top-3 summaries plus the answer as separate calls, against one packed request
+    per_case, packed, tokens = [], [], []
+    for i in range(args.llm_requests):
+        hits = [cases[(i + j) % len(cases)] for j in range(3)]
+        query = f"[{size}-{i}] dowry harassment and property dispute"
+        prompts = {j: llmcalls.SIMPLIFY_PROMPT.format(summary=f"[{size}-{i}] {case['summaries']}") for j, case in enumerate(hits)}
+        prompts["answer"] = "\n\n".join(case["summaries"] for case in hits) + f"\n\nAnswer this query:\n{query}"
+        per_case.append(timed(llmcalls.run_prompts, gemini, prompts, {key: "" for key in prompts})[0])
+        prompt, _ = promptpack.pack_cases(query, [{"name": case.get("client", ""), "charges": ", ".join(case.get("charges", [])),
+                                                   "texts": [case["summaries"]]} for case in hits])
+        tokens.append(promptpack.count_tokens(prompt))
+        packed.append(timed(llmcalls.run_prompts, gemini, {"packed": prompt}, {"packed": ""})[0])
+    stages["gemini_query_per_case"] = summarize(per_case)
+    stages["gemini_query_packed"] = summarize(packed)
+    stages["packed_prompt_tokens"] = float(np.mean(tokens))
+
+    # TTS of typical answers through the audio cache: new texts first, then the same ones again
+    answers = [" ".join(lorem(rng, 120, 8).split("\n")) for _ in range(args.llm_requests)]
+    with tempfile.TemporaryDirectory() as tts_dir:
+        tts = ttscache.TTSCache(ttscache.FakeTTS(args.tts_latency), cache_dir=tts_dir)
+        stages["tts"] = summarize([timed(tts.synthesize, answer)[0] for answer in answers])
+        stages["tts_cached"] = summarize([timed(tts.synthesize, answer)[0] for answer in answers])
+        tts.pool.shutdown()
+
+    return {"cases": len(cases), "chunks": len(chunk_texts), "stages": stages, "peak_rss_mb": peak_rss_mb()}
+
+
+def _run_size_child(size, args, workdir):
+    llmcache._cache = llmcache.ResponseCache(db_path="off")
+    return run_size(size, args, workdir)
+
+
+#run_size in a fresh process, so the peak RSS it reports belongs to that size alone
+def run_size_isolated(size, args, workdir):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_run_size_child, size, args, workdir).result()
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# each runs in a fresh interpreter; "ready" means what a user waits for before the first search:
+# the Gradio apps build their UI while the warm-up thread loads the models and case indexes
+STARTUP_SCRIPTS = {
+    "lawfirmm_help": ["lawfirmm.py", "--help"],
+    "import_lawfirmtts": ["-c", "import lawfirmtts"],
+    "import_wcss": ["-c", "import wcss"],
+    "import_improvedlawfirm": ["-c", "import improvedlawfirm"],
+    "import_lawfirmm": ["-c", "import lawfirmm"],
+    "import_server": ["-c", "import server"],
+    "ready_lawfirmtts": ["-c", "import lawfirmtts as app, lazy; t = lazy.warm_up(app.embedder, app.case_watcher, app.reranker, app.gemini); "
+                               "app.build_ui(); t.join(); app.case_watcher.get(); app.reranker.get(); app.gemini.get()"],
+    "ready_wcss": ["-c", "import wcss as app, lazy; t = lazy.warm_up(app.embedder, app.case_watcher, app.reranker, app.gemini); "
+                         "app.build_ui(); t.join(); app.case_watcher.get(); app.reranker.get(); app.gemini.get()"],
+    "ready_improvedlawfirm": ["-c", "import improvedlawfirm as app, lazy; t = lazy.warm_up(app.embedder, app.reranker, app.gemini); "
+                                    "app.build_ui(); t.join(); app.embedder.get(); app.reranker.get(); app.gemini.get()"],
+    "ready_lawfirmm": ["-c", "import lawfirmm as app; app.model.get()"],
+}
+
+
+#wall time of a script from launch to exit, or the reason it failed
+def time_script(script, runs):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable] + script, cwd=HERE, capture_output=True, text=True)
+        if done.returncode:
+            lines = (done.stderr or done.stdout).strip().splitlines()
+            return {"error": lines[-1] if lines else f"exit code {done.returncode}"}
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def free_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+#(HTTP status, JSON body) of a GET, or (None, {}) while nothing is listening
+def get_json(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except OSError:
+        return None, {}
+
+
+#server.py: seconds until /healthz answers (listening) and until /readyz returns 200 (model and indexes warm)
+def time_server(runs, timeout=600):
+    listening, ready = [], []
+    for _ in range(runs):
+        port = free_port()
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "server.py", "--port", str(port)], cwd=HERE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            up = None
+            while True:
+                if process.poll() is not None:
+                    lines = process.stderr.read().strip().splitlines()
+                    return {"error": lines[-1] if lines else f"exit code {process.returncode}"}, None
+                if time.perf_counter() - start > timeout:
+                    return {"error": f"not ready after {timeout}s"}, None
+                status, body = get_json(f"http://127.0.0.1:{port}/{'readyz' if up else 'healthz'}")
+                if body.get("status") == "error":
+                    return {"error": f"warm-up failed: {body.get('error')}"}, None
+                if status != 200:
+                    time.sleep(0.01)
+                elif up is None:
+                    up = time.perf_counter() - start
+                else:
+                    listening.append(up)
+                    ready.append(time.perf_counter() - start)
+                    break
+        finally:
+            process.terminate()
+            process.wait()
+    return summarize(listening), summarize(ready)
+
+
+def run_startup(runs):
+    stages = {name: time_script(script, runs) for name, script in STARTUP_SCRIPTS.items()}
+    listening, ready = time_server(runs)
+    stages["listening_server"] = listening
+    stages["ready_server"] = ready or listening
+    return {"stages": stages}
+
+
+def print_stages(label, stages):
+    for stage, stats in stages.items():
+        if isinstance(stats, dict) and "error" in stats:
+            print(f"{label:>7} {stage:<28} failed: {stats['error']}")
+        elif isinstance(stats, dict):
+            print(f"{label:>7} {stage:<28} p50 {stats['p50_ms']:9.2f}  p95 {stats['p95_ms']:9.2f}  p99 {stats['p99_ms']:9.2f} ms")
+        else:
+            print(f"{label:>7} {stage:<28} {stats:.3f}")
+
+
+def compare(current, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for size, result in current["results"].items():
+        old = baseline.get("results", {}).get(size)
+        if not old:
+            continue
+        for stage, stats in result["stages"].items():
+            before = old["stages"].get(stage)
+            if not isinstance(stats, dict) or not isinstance(before, dict) or not stats.get("p95_ms") or not before.get("p95_ms"):
+                continue
+            ratio = stats["p95_ms"] / before["p95_ms"]
+            flag = "REGRESSION" if ratio > 1 + tolerance else ""
+            print(f"{size:>7} {stage:<28} p95 {before['p95_ms']:9.2f} -> {stats['p95_ms']:9.2f} ms ({ratio:5.2f}x) {flag}")
+            if flag:
+                regressions.append((size, stage))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse, embed, search, Gemini and TTS stages.")
+    parser.add_argument("--sizes", default="10,1000", help="comma-separated corpus sizes, e.g. 10,1000,10000,100000")
+    parser.add_argument("--workdir", default=os.path.join(casestore.CACHE_DIR, "bench"), help="where corpora are generated")
+    parser.add_argument("--words", type=int, default=120, help="filler words per section in generated cases")
+    parser.add_argument("--embedder", default="hash", help='"hash" (no model), an embedding backend (torch, onnx, onnx-int8) or a model name')
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--extractors", default="fast,python-docx", help="docx extractors to time")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--llm-requests", type=int, default=20)
+    parser.add_argument("--gemini-latency", type=float, default=0.2, help="seconds per fake Gemini call")
+    parser.add_argument("--tts-latency", type=float, default=0.0005, help="fake TTS seconds per character")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--startup", action="store_true", help="also time the startup of every entry point")
+    parser.add_argument("--startup-runs", type=int, default=3, help="launches per entry point with --startup")
+    parser.add_argument("--compare", metavar="BASELINE", help="previous result file to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p95 slowdown before flagging (0.10 = 10%%)")
+    parser.add_argument("--same-process", action="store_true",
+                        help="run every size in this process; peak RSS is then a running maximum over the sizes so far")
+    args = parser.parse_args()
+    args.extractors = [e for e in args.extractors.split(",") if e]
+    # measure the pipeline, not the reply cache
+    llmcache._cache = llmcache.ResponseCache(db_path="off")
+
+    results = {}
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        if args.same_process:
+            results[str(size)] = run_size(size, args, args.workdir)
+            results[str(size)]["peak_rss_scope"] = "running max"
+        else:
+            results[str(size)] = run_size_isolated(size, args, args.workdir)
+            results[str(size)]["peak_rss_scope"] = "size"
+        print_stages(str(size), results[str(size)]["stages"])
+        print(f"{size:>7} {'peak RSS (' + results[str(size)]['peak_rss_scope'] + ')':<28} {format_mb(results[str(size)]['peak_rss_mb'])}")
+    if args.startup:
+        results["startup"] = run_startup(args.startup_runs)
+        print_stages("startup", results["startup"]["stages"])
+
+    report = {
+        "meta": {"time": time.time(), "git": git_revision(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "args": vars(args)},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare and compare(report, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import fastdocx
+import hashlib
+import os
+import pickle
+import threading
+
+# Parsed cases are kept in a pickle next to the app (override with LAWFIRM_CACHE_DIR)
+CACHE_DIR = os.getenv("LAWFIRM_CACHE_DIR", ".lawfirm_cache")
+STORE_FORMAT = 1
+# "fast" streams document.xml directly; "python-docx" builds the full Document object
+DOCX_EXTRACTOR = os.getenv("LAWFIRM_DOCX_EXTRACTOR", "fast")
+
+
+def is_case_file(filename):
+    return filename.endswith(".docx") and filename.lower().startswith("case")
+
+
+def file_digest(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+#turn the paragraphs of one Case*.docx into a case record
+def parse_paragraphs(filename, paragraphs):
+    current_case = {"source": filename, "summaries": "", "charges": []}
+    summary_lines = []
+
+    for text in paragraphs:
+        text = text.strip()
+        if not text:
+            continue
+        if " v. " in text and "client" not in current_case:
+            current_case["client"] = text
+        elif "section" in text.lower() and not current_case["charges"]:
+            charges = text.split(":", 1)[-1].strip()
+            current_case["charges"] = [s.strip() for s in charges.split(",")]
+        else:
+            summary_lines.append(text)
+
+    current_case["summaries"] = "\n".join(summary_lines).strip()
+    return current_case if "client" in current_case else None
+
+
+#paragraph strings of a .docx, through either extractor (both give identical text)
+def read_paragraphs(file_path, extractor=None):
+    extractor = extractor or DOCX_EXTRACTOR
+    if extractor == "fast":
+        return fastdocx.iter_paragraphs(file_path)
+    if extractor == "python-docx":
+        from docx import Document
+        return (para.text for para in Document(file_path).paragraphs)
+    raise ValueError(f"Unknown docx extractor: {extractor}")
+
+
+def parse_case_file(file_path, extractor=None):
+    return parse_paragraphs(os.path.basename(file_path), read_paragraphs(file_path, extractor))
+
+
+#short stable id of a file or folder path, used in cache file names
+def path_key(path):
+    return hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+
+
+class CaseStore:
+    """Parsed cases of one folder, persisted on disk and refreshed incrementally.
+
+    Every entry is keyed by file name and remembers mtime, size and sha1 of the
+    document it was parsed from, so only new or changed files get re-parsed.
+    """
+
+    def __init__(self, folder_path, store_path=None):
+        self.folder_path = folder_path
+        # names this folder's files in the shared cache dir (parsed cases, embedding indexes)
+        self.key = path_key(folder_path)
+        if store_path is None:
+            store_path = os.path.join(CACHE_DIR, f"cases-{self.key}.pkl")
+        self.store_path = store_path
+        self.entries = {}
+        self.cases = []
+        self.version = ""
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.store_path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return
+        if data.get("format") == STORE_FORMAT:
+            self.entries = data["entries"]
+            self._rebuild()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+        tmp_path = f"{self.store_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"format": STORE_FORMAT, "entries": self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.store_path)
+
+    def _rebuild(self):
+        names = sorted(self.entries)
+        self.cases = [self.entries[name]["case"] for name in names if self.entries[name]["case"]]
+        digest = hashlib.sha1()
+        for name in names:
+            digest.update(f"{name}\0{self.entries[name]['sha1']}\n".encode("utf-8"))
+        self.version = digest.hexdigest()
+
+    def scan(self):
+        found = {}
+        with os.scandir(self.folder_path) as it:
+            for entry in it:
+                if entry.is_file() and is_case_file(entry.name):
+                    st = entry.stat()
+                    found[entry.name] = (entry.path, st.st_mtime_ns, st.st_size)
+        return found
+
+    # Drop deleted files and return (name, path, mtime, size) for new or modified ones
+    def pending(self):
+        found = self.scan()
+        removed = [name for name in self.entries if name not in found]
+        for name in removed:
+            del self.entries[name]
+        stale = [(name, path, mtime, size) for name, (path, mtime, size) in found.items()
+                 if not (name in self.entries and self.entries[name]["mtime"] == mtime and self.entries[name]["size"] == size)]
+        return stale, bool(removed)
+
+    def commit(self):
+        self._rebuild()
+        self._save()
+
+    # Stat every case file, re-parse only what changed and drop deleted files
+    def refresh(self):
+        with self.lock:
+            stale, changed = self.pending()
+            for name, path, mtime, size in stale:
+                self.entries[name] = build_entry(path, mtime, size, self.entries.get(name))
+                changed = True
+            if changed:
+                self.commit()
+            return self.cases
+
+
+#hash and parse one file; a file whose content is unchanged keeps its previous record
+def build_entry(path, mtime, size, previous=None):
+    try:
+        sha1 = file_digest(path)
+        if previous and previous["sha1"] == sha1:
+            # touched or copied but identical content
+            return dict(previous, mtime=mtime, size=size)
+        return {"mtime": mtime, "size": size, "sha1": sha1, "case": parse_case_file(path)}
+    except Exception as e:
+        # a malformed file is remembered as unparseable until it changes again
+        return {"mtime": mtime, "size": size, "sha1": "", "case": None, "error": f"{type(e).__name__}: {e}"}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(folder_path):
+    key = os.path.abspath(folder_path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = CaseStore(folder_path)
+        return _stores[key]
+
+
+#loading the legal cases from the cache, re-parsing only new or changed files
+def load_cases(folder_path):
+    return get_store(folder_path).refresh()
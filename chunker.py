@@ -0,0 +1,105 @@
+from embedindex import EmbeddingIndex
+import numpy as np
+import vectorsearch
+
+# ~180 words stays under the 256-token window of all-MiniLM-L6-v2
+MAX_WORDS = 180
+OVERLAP_WORDS = 30
+# how many chunks to pull per requested case before aggregating (more are pulled while
+# a few long cases fill the pool)
+CANDIDATES_PER_CASE = 8
+
+
+#split a case text into overlapping chunks along paragraph boundaries
+def split_chunks(text, max_words=MAX_WORDS, overlap_words=OVERLAP_WORDS):
+    paragraphs = [p.split() for p in text.splitlines() if p.strip()]
+    chunks = []
+    current = []
+    for words in paragraphs:
+        # a single paragraph longer than a chunk is cut into overlapping windows
+        while len(words) > max_words:
+            if current:
+                chunks.append(current)
+                current = []
+            chunks.append(words[:max_words])
+            words = words[max_words - overlap_words:]
+        if current and len(current) + len(words) > max_words:
+            chunks.append(current)
+            current = current[-overlap_words:] if overlap_words else []
+        current = current + words
+    if current:
+        chunks.append(current)
+    return [" ".join(words) for words in chunks]
+
+
+class ChunkIndex:
+    """Embeds every case as a list of chunks and ranks cases by their best chunks."""
+
+    def __init__(self, name, embedder, aggregate="max", batch_size=None, **index_options):
+        self.index = EmbeddingIndex(name, embedder, batch_size=batch_size, **index_options)
+        self.aggregate = aggregate
+        self.version = None
+        self.chunks = []
+        self.chunk_case = np.empty(0, dtype=np.int64)
+
+    def update(self, cases, version):
+        if version != self.version:
+            chunks, owners, texts = [], [], []
+            for i, case in enumerate(cases):
+                for chunk in split_chunks(case.get("summaries", "")) or [""]:
+                    chunks.append(chunk)
+                    owners.append(i)
+                    texts.append(f"{case.get('client', '')}: {chunk}")
+            self.index.update(texts, version)
+            self.chunks = chunks
+            self.chunk_case = np.array(owners, dtype=np.int64)
+            self.version = version
+
+    #rows of one case's chunks (chunks are stored in case order)
+    def case_rows(self, case):
+        return range(*np.searchsorted(self.chunk_case, [case, case + 1]))
+
+    # Returns [(case index, score, best chunks)] for the top_k cases
+    # `cases` (sorted case ids) restricts the search to those cases' chunks
+    def search(self, query, top_k=3, per_case=2, aggregate=None, cases=None):
+        aggregate = aggregate or self.aggregate
+        if cases is not None:
+            starts = np.searchsorted(self.chunk_case, cases)
+            ends = np.searchsorted(self.chunk_case, np.asarray(cases) + 1)
+            rows = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)] or [np.empty(0, dtype=np.int64)])
+            return self._rank_rows(query, rows, top_k, per_case, aggregate)
+        if aggregate == "sum":
+            # a sum needs every chunk of a case, not just the ones that made the candidate pool
+            return self._rank_rows(query, np.arange(len(self.chunk_case)), top_k, per_case, aggregate)
+
+        # a case's max is its best chunk, so the best chunk hits hold the best cases once they
+        # cover top_k distinct cases; a long judgment can fill the first pool on its own
+        k = top_k * CANDIDATES_PER_CASE
+        while True:
+            rows, scores = self.index.search(query, k)
+            if len(np.unique(self.chunk_case[rows])) >= top_k or k >= len(self.chunk_case):
+                break
+            k *= 4
+        totals = {}
+        hits = {}
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            case = int(self.chunk_case[row])
+            totals[case] = max(totals.get(case, score), score)
+            hits.setdefault(case, []).append(row)
+        ranked = sorted(totals, key=totals.get, reverse=True)[:top_k]
+        return [(case, totals[case], [self.chunks[row] for row in hits[case][:per_case]]) for case in ranked]
+
+    #exact per-case max or sum over every chunk in `rows` (grouped by case, in case order)
+    def _rank_rows(self, query, rows, top_k, per_case, aggregate):
+        if not len(rows):
+            return []
+        scores = self.index.scores(query, rows)
+        owners = self.chunk_case[rows]
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        ends = np.r_[starts[1:], len(rows)]
+        totals = (np.add if aggregate == "sum" else np.maximum).reduceat(scores, starts)
+        results = []
+        for i in vectorsearch.top_k(totals, top_k):
+            best = starts[i] + np.argsort(-scores[starts[i]:ends[i]], kind="stable")[:per_case]
+            results.append((int(owners[starts[i]]), float(totals[i]), [self.chunks[rows[j]] for j in best]))
+        return results
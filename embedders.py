@@ -0,0 +1,185 @@
+from casestore import CACHE_DIR
+import json
+import numpy as np
+import os
+
+# Interchangeable sentence-embedding backends for CPU inference. All of them take
+# encode(texts, batch_size=None) like SentenceTransformer and return float32 rows.
+#   torch      - sentence-transformers as before
+#   onnx       - the same network exported once to ONNX and run with ONNX Runtime
+#   onnx-int8  - that ONNX graph with dynamically quantized int8 weights
+# python embedders.py   compares each backend's top-k retrieval with torch on the bundled cases
+
+MODEL_NAME = os.getenv("LAWFIRM_EMBED_MODEL", "all-MiniLM-L6-v2")
+EMBED_BACKEND = os.getenv("LAWFIRM_EMBED_BACKEND", "torch")
+EMBED_BATCH = int(os.getenv("LAWFIRM_EMBED_BATCH", "64"))
+EMBED_THREADS = int(os.getenv("LAWFIRM_EMBED_THREADS", "0"))  # 0 = the library's default
+ONNX_DIR = os.path.join(CACHE_DIR, "onnx")
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name=MODEL_NAME, batch_size=EMBED_BATCH, threads=EMBED_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.batch_size = batch_size
+        # same cache key as before backends existed, so stored embeddings stay valid
+        self.model_name = model_name
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        return self.model.encode(list(texts), batch_size=batch_size or self.batch_size, convert_to_numpy=True, **kwargs)
+
+
+#export the transformer of a sentence-transformers model to ONNX (once; reused from ONNX_DIR)
+def export_onnx(model_name=MODEL_NAME, quantize=False, onnx_dir=ONNX_DIR):
+    folder = os.path.join(onnx_dir, model_name.replace("/", "__"))
+    fp32_path = os.path.join(folder, "model.onnx")
+    int8_path = os.path.join(folder, "model_int8.onnx")
+    if not os.path.exists(fp32_path):
+        import inspect
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name, device="cpu")
+        tokenizer = model.tokenizer
+        os.makedirs(folder, exist_ok=True)
+        sample = tokenizer(["export"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+        class TokenEmbeddings(torch.nn.Module):
+            # only the per-token output; pooling happens in numpy
+            def __init__(self, transformer):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, *inputs):
+                return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+        axes = {name: {0: "batch", 1: "tokens"} for name in input_names + ["last_hidden_state"]}
+        options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        tmp_path = f"{fp32_path}.{os.getpid()}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(TokenEmbeddings(model[0].auto_model.eval()), tuple(sample[name] for name in input_names),
+                              tmp_path, input_names=input_names, output_names=["last_hidden_state"],
+                              dynamic_axes=axes, opset_version=14, **options)
+        tokenizer.save_pretrained(folder)
+        # pooling settings the runtime needs to reproduce model.encode
+        with open(os.path.join(folder, "lawfirm_embedder.json"), "w", encoding="utf-8") as f:
+            json.dump({"model": model_name, "max_seq_length": model.max_seq_length,
+                       "normalize": any(type(m).__name__ == "Normalize" for m in model)}, f)
+        os.replace(tmp_path, fp32_path)
+    if quantize and not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    return int8_path if quantize else fp32_path
+
+
+class OnnxEmbedder:
+    """Mean-pooled sentence embeddings from an exported ONNX graph; needs only
+    onnxruntime and the tokenizer at run time (torch only for the one-off export).
+    """
+
+    def __init__(self, model_name=MODEL_NAME, batch_size=EMBED_BATCH, threads=EMBED_THREADS, quantize=False):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = export_onnx(model_name, quantize)
+        folder = os.path.dirname(path)
+        with open(os.path.join(folder, "lawfirm_embedder.json"), encoding="utf-8") as f:
+            config = json.load(f)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(folder)
+        self.max_seq_length = config["max_seq_length"]
+        self.normalize = config["normalize"]
+        self.batch_size = batch_size
+        self.model_name = f"{model_name}:{'onnx-int8' if quantize else 'onnx'}"
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        texts = list(texts)
+        batch_size = batch_size or self.batch_size
+        out = np.zeros((len(texts), 0), dtype=np.float32)
+        # similar lengths in a batch means less padding to run through the network
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            batch = self.tokenizer([texts[i] for i in rows], padding=True, truncation=True,
+                                   max_length=self.max_seq_length, return_tensors="np")
+            feeds = {name: batch[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = batch["attention_mask"][..., None].astype(np.float32)
+            vectors = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if self.normalize:
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            if out.shape[1] == 0:
+                out = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[rows] = vectors
+        return out
+
+
+def make_embedder(backend=None, model_name=MODEL_NAME, batch_size=EMBED_BATCH, threads=EMBED_THREADS):
+    backend = backend or EMBED_BACKEND
+    if backend == "torch":
+        return SentenceTransformerEmbedder(model_name, batch_size, threads)
+    if backend == "onnx":
+        return OnnxEmbedder(model_name, batch_size, threads)
+    if backend == "onnx-int8":
+        return OnnxEmbedder(model_name, batch_size, threads, quantize=True)
+    raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+
+# python embedders.py [folder]  -- top-k agreement and speed of every backend against torch
+if __name__ == "__main__":
+    import argparse
+    import casestore
+    import chunker
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Check that the embedding backends retrieve the same cases.")
+    parser.add_argument("folder", nargs="?", default=".", help="folder with Case*.docx files (default: the bundled ones)")
+    parser.add_argument("--backends", default="onnx,onnx-int8")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-agreement", type=float, default=0.9, help="fail below this mean top-k overlap")
+    args = parser.parse_args()
+
+    cases = casestore.load_cases(args.folder)
+    texts = [f"{case.get('client', '')}: {chunk}" for case in cases for chunk in chunker.split_chunks(case["summaries"])]
+    queries = [case.get("client", "") for case in cases] + [", ".join(case.get("charges", [])) for case in cases] + [
+        "dowry harassment", "medical negligence at a hospital", "wrongful termination and unpaid gratuity",
+        "bank fraud and cheating", "defamation by a news channel", "murder with common intention"]
+    print(f"{len(cases)} cases, {len(texts)} chunks, {len(queries)} queries, k={args.k}")
+
+    def run(embedder):
+        embedder.encode(texts[:2])  # warm-up
+        start = time.perf_counter()
+        corpus = embedder.encode(texts)
+        seconds = time.perf_counter() - start
+        corpus /= np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        query_vectors = embedder.encode(queries)
+        query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+        return corpus, np.argsort(-(query_vectors @ corpus.T), axis=1)[:, :args.k], seconds
+
+    base_corpus, base_top, base_seconds = run(make_embedder("torch"))
+    print(f"{'torch':<10} {len(texts) / base_seconds:8.1f} texts/s")
+    failed = False
+    for backend in [b for b in args.backends.split(",") if b]:
+        corpus, top, seconds = run(make_embedder(backend))
+        agreement = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(base_top, top)])
+        cosine = float(np.mean(np.sum(base_corpus * corpus, axis=1)))
+        print(f"{backend:<10} {len(texts) / seconds:8.1f} texts/s ({base_seconds / seconds:.1f}x), "
+              f"top-{args.k} agreement {agreement:.3f}, mean cosine to torch {cosine:.4f}")
+        failed = failed or agreement < args.min_agreement
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,178 @@
+from casestore import CACHE_DIR
+import hashlib
+import json
+import metrics
+import numpy as np
+import os
+import threading
+import vectorsearch
+
+
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+# one file per index version: a JSON header (model, corpus version, text keys) followed by the raw
+# vectors, so keys and vectors are written together and the vectors can be memory-mapped
+VECTORS_MAGIC = b"LAWFIRMVEC1\n"
+
+
+def write_vectors(path, meta, vectors):
+    vectors = np.ascontiguousarray(vectors)
+    header = json.dumps(dict(meta, dtype=vectors.dtype.str, shape=list(vectors.shape))).encode("utf-8")
+    start = len(VECTORS_MAGIC) + 8 + len(header)
+    offset = -(-start // 64) * 64
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(VECTORS_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(b"\0" * (offset - start))
+        vectors.tofile(f)
+    os.replace(tmp_path, path)
+
+
+#(meta, read-only memory-mapped vectors) of a file written by write_vectors
+def read_vectors(path):
+    with open(path, "rb") as f:
+        if f.read(len(VECTORS_MAGIC)) != VECTORS_MAGIC:
+            raise ValueError(f"not a vector file: {path}")
+        size = int.from_bytes(f.read(8), "little")
+        meta = json.loads(f.read(size))
+    offset = -(-(len(VECTORS_MAGIC) + 8 + size) // 64) * 64
+    shape = tuple(meta["shape"])
+    if not shape[0]:
+        return meta, np.empty(shape, dtype=meta["dtype"])
+    return meta, np.memmap(path, dtype=meta["dtype"], mode="r", offset=offset, shape=shape)
+
+
+class EmbeddingIndex:
+    """Unit-length embeddings for a list of texts, persisted in a memory-mapped vector file.
+
+    The index remembers the corpus version it was built for; when that version
+    changes, rows are reused by text hash and only new texts are encoded.
+    Every version is saved to its own file (`<name>.<digest>.vec`) that is never
+    rewritten, so readers that still map an older version are not disturbed.
+    """
+
+    def __init__(self, name, embedder, model_name=None, dtype=np.float32, cache_dir=CACHE_DIR, batch_size=None,
+                 backend=vectorsearch.SEARCH_BACKEND):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        # vectors from another model or backend are not reused
+        self.model_name = model_name or getattr(embedder, "model_name", "all-MiniLM-L6-v2")
+        self.dtype = np.dtype(dtype)
+        self.name = name
+        self.cache_dir = cache_dir
+        self.backend = backend
+        self.version = None
+        self.keys = []
+        self.vectors = None
+        self.searcher = None
+        self.lock = threading.Lock()
+        self._load()
+
+    def _path(self, version):
+        digest = hashlib.sha1(f"{self.model_name}\0{self.dtype.str}\0{version}".encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{self.name}.{digest}.vec")
+
+    #saved versions of this index, newest first
+    def _files(self):
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        files = []
+        for f in names:
+            if f.startswith(f"{self.name}.") and f.endswith(".vec") and len(f) == len(self.name) + 17:
+                path = os.path.join(self.cache_dir, f)
+                try:
+                    files.append((os.stat(path).st_mtime_ns, path))
+                except OSError:
+                    pass  # removed by another process meanwhile
+        return [path for _, path in sorted(files, reverse=True)]
+
+    def _load(self):
+        for path in self._files():
+            try:
+                meta, vectors = read_vectors(path)
+            except (OSError, ValueError, KeyError):
+                continue
+            if meta.get("model") != self.model_name or vectors.dtype != self.dtype or len(vectors) != len(meta["keys"]):
+                continue
+            self.version = meta["version"]
+            self.keys = meta["keys"]
+            self.vectors = vectors
+            self.searcher = vectorsearch.make_searcher(vectors, self.backend)
+            return
+
+    def _save(self):
+        os.makedirs(self.cache_dir or ".", exist_ok=True)
+        path = self._path(self.version)
+        if os.path.exists(path):
+            os.utime(path)  # back to an earlier version: it becomes the newest file again
+        else:
+            write_vectors(path, {"model": self.model_name, "version": self.version, "keys": self.keys}, self.vectors)
+        self.vectors = read_vectors(path)[1]
+        # older versions go; one still mapped (Windows won't delete it) is retried after the next save
+        files = self._files()
+        for old in files[files.index(path) + 1:] if path in files else []:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    @metrics.timed("encode")
+    def encode(self, texts):
+        if self.batch_size:
+            return normalize(self.embedder.encode(list(texts), batch_size=self.batch_size))
+        return normalize(self.embedder.encode(list(texts)))
+
+    # Make the index match `texts`, encoding only texts it has not seen before
+    def update(self, texts, version):
+        with self.lock:
+            if version == self.version and self.vectors is not None:
+                return self.vectors
+
+            keys = [text_key(text) for text in texts]
+            known = {key: row for row, key in enumerate(self.keys)}
+            missing = [i for i, key in enumerate(keys) if key not in known]
+
+            dim = self.vectors.shape[1] if self.vectors is not None and len(self.vectors) else None
+            fresh = self.encode([texts[i] for i in missing]) if missing else None
+            if dim is None:
+                dim = fresh.shape[1] if fresh is not None else 0
+
+            vectors = np.empty((len(keys), dim), dtype=self.dtype)
+            for i, key in enumerate(keys):
+                if key in known:
+                    vectors[i] = self.vectors[known[key]]
+            if missing:
+                vectors[missing] = fresh
+
+            self.keys = keys
+            self.version = version
+            self.vectors = vectors
+            self._save()
+            # built here, with the rest of the update, so no search pays for it
+            self.searcher = vectorsearch.make_searcher(self.vectors, self.backend)
+            return self.vectors
+
+    #cosine similarity of one query against every row
+    @metrics.timed("semantic")
+    def scores(self, query, rows=None):
+        query_vector = self.encode([query])[0]
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        return np.asarray(vectors @ query_vector.astype(self.dtype), dtype=np.float32)
+
+    #top-k rows for a query through the configured vector-search backend
+    @metrics.timed("semantic")
+    def search(self, query, k):
+        return self.searcher.search(self.encode([query])[0], k)
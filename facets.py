@@ -0,0 +1,192 @@
+import numpy as np
+import re
+
+# Charges normalized to canonical section keys, plus facet postings (section, party
+# type, year) that turn search filters into a set of case ids before any scoring.
+#   normalize_charges(["IPC §498A", "§406"])  -> ["IPC:498A", "IPC:406"]
+#   normalize_charges(["498A IPC"])           -> ["IPC:498A"]
+#   normalize_charges(["IPC 498-A"])          -> ["IPC:498A"]
+
+# longest aliases first, so "it act" wins over "act"
+ACTS = [
+    ("indian penal code", "IPC"), ("ipc", "IPC"),
+    ("code of criminal procedure", "CRPC"), ("cr.p.c", "CRPC"), ("crpc", "CRPC"),
+    ("code of civil procedure", "CPC"), ("cpc", "CPC"),
+    ("information technology act", "IT"), ("it act", "IT"),
+    ("hindu marriage act", "HMA"), ("hma", "HMA"),
+    ("industrial disputes act", "ID"), ("id act", "ID"),
+    ("payment of gratuity act", "GRATUITY"), ("gratuity act", "GRATUITY"),
+    ("consumer protection act", "CPA"),
+    ("constitution", "CONST"), ("articles", "CONST"), ("article", "CONST"), ("art.", "CONST"),
+]
+_ACT_PATTERN = "|".join(re.escape(alias) for alias, _ in sorted(ACTS, key=lambda a: -len(a[0])))
+_ACT_KEYS = dict(ACTS)
+# an act name, a section number (with optional marker and sub-clauses like 19(1)(a)), or a ";" boundary
+_CHARGE_TOKEN = re.compile(
+    rf"(?P<act>\b(?:{_ACT_PATTERN})(?=\W|$))"
+    r"|(?P<marker>§|\bsections?\b|\bsecs?\.?|\bu/s\.?|\bs\.)?\s*"
+    # "498A", "498-A" and "498 A" are one section; a spaced suffix must be a capital ("420 r/w 34" is not 420R)
+    r"(?P<section>\b\d{1,4}(?:-?[a-z]{1,2}|\s(?-i:[A-Z])(?![\w/]))?)\b(?:\(\w+\))*"
+    r"|(?P<sep>;)",
+    re.IGNORECASE,
+)
+_YEAR = re.compile(r"\b(19\d\d|20\d\d)\b")
+
+STATE_PREFIXES = ("state of ", "union of india", "government", "govt")
+COMPANY_WORDS = ("ltd", "limited", "pvt", "private", "inc", "corp", "llp", "bank", "company", "co.", "media", "industries", "tech")
+PUBLIC_BODY_WORDS = ("commission", "office", "hospital", "municipal", "corporation", "board", "authority",
+                     "department", "university", "police", "court", "trust", "council")
+PARTY_TYPES = ("state", "company", "public_body", "individual")
+_COMPANY = re.compile(r"\b(?:" + "|".join(re.escape(word) for word in COMPANY_WORDS) + r")(?=\W|$)")
+_PUBLIC_BODY = re.compile(r"\b(?:" + "|".join(re.escape(word) for word in PUBLIC_BODY_WORDS) + r")\b")
+
+
+#canonical "ACT:SECTION" keys (or a bare "SECTION" when no act is named) for a list of charges
+def normalize_charges(charges):
+    keys = []
+    carried_act = None
+    for charge in charges:
+        act = None
+        pending = []
+        for match in _CHARGE_TOKEN.finditer(charge):
+            if match.group("sep"):
+                act, pending = None, []
+            elif match.group("act"):
+                act = _ACT_KEYS[match.group("act").lower()]
+                carried_act = act
+                # "498A IPC": numbers written before the act belong to it
+                keys += [f"{act}:{section}" for section in pending]
+                pending = []
+            else:
+                section = re.sub(r"[-\s]", "", match.group("section")).upper()
+                # a bare four-digit number is a year, not a section
+                if not match.group("marker") and len(section) == 4 and section.isdigit():
+                    continue
+                if act:
+                    keys.append(f"{act}:{section}")
+                else:
+                    pending.append(section)
+        # "IPC §498A, §406" is usually split on the comma; the act carries over to "§406"
+        keys += [f"{carried_act}:{section}" if carried_act else section for section in pending]
+    return list(dict.fromkeys(keys))
+
+
+#every key a case can be found under: "IPC:498A" and also the bare "498A"
+def lookup_keys(keys):
+    expanded = []
+    for key in keys:
+        expanded.append(key)
+        if ":" in key:
+            expanded.append(key.split(":", 1)[1])
+    return list(dict.fromkeys(expanded))
+
+
+#section keys of a case: its charges, and for Case*.docx files the "Case Type:" line of the title block
+def case_sections(case):
+    keys = normalize_charges(case.get("charges", []))
+    for line in case.get("client", "").splitlines():
+        if line.lower().startswith("case type"):
+            keys += normalize_charges([line.split(":", 1)[-1]])
+    return lookup_keys(keys)
+
+
+#"X v. Y" out of a title such as 'Cover Page for the case "Roy v. State of X".' or "Neha v. Suresh (2023)"
+def parties(client):
+    title = client.splitlines()[0] if client else ""
+    quoted = re.search(r'"([^"]+ v\. [^"]+)"', title)
+    if quoted:
+        title = quoted.group(1)
+    if " v. " not in title:
+        return None, None
+    left, right = title.split(" v. ", 1)
+    right = re.sub(r"\s*\([^)]*\)\s*\.?$", "", right).strip()
+    return left.strip(), right.strip()
+
+
+def party_type(name):
+    if not name:
+        return None
+    lowered = name.lower()
+    # "State Hospital" is a public body, "State of X" is the state
+    if lowered == "state" or lowered.startswith(STATE_PREFIXES):
+        return "state"
+    if _COMPANY.search(lowered):
+        return "company"
+    if _PUBLIC_BODY.search(lowered):
+        return "public_body"
+    return "individual"
+
+
+def case_year(case):
+    title = case.get("client", "").splitlines()[0] if case.get("client") else ""
+    match = _YEAR.search(title)
+    return int(match.group(1)) if match else None
+
+
+class FacetIndex:
+    """Case ids by section key, party type (either side of the title) and year."""
+
+    def __init__(self, cases):
+        sections, party, years = {}, {}, {}
+        for i, case in enumerate(cases):
+            for key in case_sections(case):
+                sections.setdefault(key, []).append(i)
+            for side in parties(case.get("client", "")):
+                kind = party_type(side)
+                if kind:
+                    party.setdefault(kind, []).append(i)
+            year = case_year(case)
+            if year is not None:
+                years.setdefault(year, []).append(i)
+        as_array = lambda ids: np.unique(np.array(ids, dtype=np.int64))
+        self.sections = {key: as_array(ids) for key, ids in sections.items()}
+        self.party = {key: as_array(ids) for key, ids in party.items()}
+        self.years = {key: as_array(ids) for key, ids in years.items()}
+        self.size = len(cases)
+
+    #sorted case ids that pass every filter, or None when no filter is set;
+    #a section filter with no recognizable section ("IPC", "garbage") matches no case
+    def filter(self, section=None, party=None, year=None):
+        allowed = None
+
+        def narrow(ids):
+            return ids if allowed is None else np.intersect1d(allowed, ids, assume_unique=True)
+
+        if section:
+            keys = section_filter_keys(section)
+            if not keys:
+                return np.empty(0, dtype=np.int64)
+            for key in keys:
+                allowed = narrow(self.sections.get(key, np.empty(0, dtype=np.int64)))
+        if party:
+            allowed = narrow(self.party.get(party, np.empty(0, dtype=np.int64)))
+        if year:
+            first, last = year
+            ids = [ids for y, ids in self.years.items() if first <= y <= last]
+            allowed = narrow(np.unique(np.concatenate(ids)) if ids else np.empty(0, dtype=np.int64))
+        return allowed
+
+
+#FacetIndex.filter arguments from free-text inputs; empty ones are left out
+def parse_filters(section="", party="", year=""):
+    filters = {}
+    if section and section.strip():
+        filters["section"] = section.strip()
+    if party and party in PARTY_TYPES:
+        filters["party"] = party
+    if parse_year(year):
+        filters["year"] = parse_year(year)
+    return filters
+
+
+#keys a section filter must all match; "IPC 498A" -> ["IPC:498A"], "302" -> ["302"]
+def section_filter_keys(text):
+    return normalize_charges([text])
+
+
+#"2020" -> (2020, 2020), "2015-2020" -> (2015, 2020), "" -> None
+def parse_year(text):
+    years = [int(y) for y in re.findall(r"\d{4}", text or "")]
+    if not years:
+        return None
+    return min(years), max(years)
@@ -0,0 +1,56 @@
+import os
+import random
+import re
+import time
+
+# Stand-in for genai.GenerativeModel so the apps can run offline.
+# Enable with LAWFIRM_FAKE_GEMINI=1; LAWFIRM_FAKE_LATENCY sets seconds per call.
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGemini:
+    model_name = "fake-gemini"
+
+    def __init__(self, latency=None, jitter=0.0, fail_rate=0.0, seed=None):
+        self.latency = float(os.getenv("LAWFIRM_FAKE_LATENCY", "0.5")) if latency is None else latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        words = prompt.split()
+        text = f"[fake reply to {len(words)} words] " + " ".join(words[:40])
+        # packed query prompts (promptpack) ask for one section per case plus the answer
+        cases = re.findall(r"^=== CASE (\d+) ===$", prompt, re.MULTILINE)
+        if cases and "### ANSWER" in prompt:
+            text = "".join(f"### CASE {i}\n[fake summary of case {i}]\n" for i in cases) + "### ANSWER\n" + text
+        if stream:
+            return self._stream(text, delay)
+        time.sleep(delay)
+        self._maybe_fail()
+        return FakeResponse(text)
+
+    # the delay is spread over a handful of chunks, like a real token stream
+    def _stream(self, text, delay, chunks=5):
+        words = text.split(" ")
+        step = max(1, -(-len(words) // chunks))
+        for start in range(0, len(words), step):
+            time.sleep(delay / chunks)
+            if start == 0:
+                self._maybe_fail()
+            yield FakeResponse(" ".join(words[start:start + step]) + " ")
+
+    def _maybe_fail(self):
+        if self.random.random() < self.fail_rate:
+            raise RuntimeError("fake Gemini failure")
+
+
+def enabled():
+    return os.getenv("LAWFIRM_FAKE_GEMINI", "") not in ("", "0")
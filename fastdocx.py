@@ -0,0 +1,107 @@
+import posixpath
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+# Reads paragraph text straight out of a .docx without building python-docx's object
+# model. Produces the same strings as `[p.text for p in Document(path).paragraphs]`.
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+P, R, HYPERLINK, BODY = W + "p", W + "r", W + "hyperlink", W + "body"
+TEXT, TAB, PTAB, BR, CR, NO_BREAK_HYPHEN = W + "t", W + "tab", W + "ptab", W + "br", W + "cr", W + "noBreakHyphen"
+
+
+#path of the main document part, normally word/document.xml
+def main_part(archive):
+    try:
+        rels = ET.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels.iter(REL + "Relationship"):
+        if rel.get("Type") == OFFICE_DOCUMENT:
+            return posixpath.normpath(rel.get("Target").lstrip("/"))
+    return "word/document.xml"
+
+
+def run_text(run):
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == TEXT:
+            parts.append(child.text or "")
+        elif tag == TAB or tag == PTAB:
+            parts.append("\t")
+        elif tag == BR:
+            # page and column breaks carry no text
+            if child.get(W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == CR:
+            parts.append("\n")
+        elif tag == NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+
+def paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == R:
+            parts.append(run_text(child))
+        elif child.tag == HYPERLINK:
+            parts.extend(run_text(run) for run in child if run.tag == R)
+    return "".join(parts)
+
+
+#yield the text of every top-level body paragraph, freeing each one once it is read
+def iter_paragraphs(file_path):
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(main_part(archive)) as xml:
+            depth = 0
+            body = None
+            for event, elem in ET.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and elem.tag == BODY:
+                        body = elem
+                    continue
+                depth -= 1
+                if depth == 2 and body is not None:
+                    if elem.tag == P:
+                        yield paragraph_text(elem)
+                    body.remove(elem)
+
+
+# python fastdocx.py Case*.docx -- check parity with python-docx and time both
+if __name__ == "__main__":
+    import glob
+    import sys
+    from docx import Document
+
+    paths = sys.argv[1:] or sorted(glob.glob("Case*.docx")) + glob.glob("cases_10.docx")
+    rounds = 20
+
+    for path in paths:
+        expected = [p.text for p in Document(path).paragraphs]
+        if list(iter_paragraphs(path)) != expected:
+            print(f"MISMATCH: {path}")
+            sys.exit(1)
+    print(f"{len(paths)} files: paragraph text identical to python-docx")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path in paths:
+            [p.text for p in Document(path).paragraphs]
+    slow = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path in paths:
+            list(iter_paragraphs(path))
+    fast = time.perf_counter() - start
+
+    per_file = rounds * len(paths)
+    print(f"python-docx: {slow / per_file * 1000:.2f} ms/file")
+    print(f"fastdocx:    {fast / per_file * 1000:.2f} ms/file ({slow / fast:.1f}x faster)")
@@ -1,26 +1,25 @@
-import gradio as gr
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from rapidfuzz import fuzz
-from dotenv import load_dotenv
 import docx2txt
-import google.generativeai as genai
-import numpy as np
+import embedders
+import embedindex
+import lazy
+import llmcalls
+import matcher
+import metrics
 import os
+import rerank
+import uploadcache
 
-# Load environment variables from .env file (must include GEMINI_API_KEY)
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
+#Gemini from GEMINI_API_KEY in .env (LAWFIRM_FAKE_GEMINI=1 uses an offline stand-in), or None without a key
+def load_gemini():
+    model = llmcalls.make_gemini(("GEMINI_API_KEY",), require_key=True)
+    if model is None:
+        print(" GEMINI_API_KEY not found in .env file.")
+    return model
 
-# Configure Gemini
-if api_key:
-    genai.configure(api_key=api_key)
-    gemini = genai.GenerativeModel("gemini-1.5-flash")
-else:
-    gemini = None
-    print(" GEMINI_API_KEY not found in .env file.")
-
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+# all three are created on first use, not at import
+gemini = lazy.Lazy(load_gemini, "gemini")
+embedder = lazy.Lazy(embedders.make_embedder, "embedder")  # LAWFIRM_EMBED_BACKEND: torch, onnx or onnx-int8
+reranker = lazy.Lazy(rerank.make_reranker, "reranker")  # LAWFIRM_RERANK_MODEL=off disables re-ranking
 
 # Function to load cases from uploaded DOCX
 def load_cases_from_file(file_path):
@@ -52,80 +51,102 @@ def load_cases_from_file(file_path):
 
     return cases, f"Loaded {len(cases)} cases."
 
+# Parse an upload and embed its client names once; repeat uploads of the same file hit the cache
+def index_upload(file_path):
+    cases, status = load_cases_from_file(file_path)
+    client_names = [case.get("client", "") for case in cases]
+    return {
+        "cases": cases,
+        "status": status,
+        "client_vectors": embedindex.normalize(embedder.encode(client_names)) if client_names else None,
+        "fuzzy_names": matcher.FuzzyNameIndex(client_names),
+    }
+
+uploads = uploadcache.UploadCache(index_upload)
+
 # Main logic
+@metrics.instrument("case_assistant")
 def case_assistant(file, client_name, question=""):
-    cases, status = load_cases_from_file(file.name if file else None)
+    file_path = file.name if file else None
+    if not file_path or not os.path.exists(file_path):
+        return " File not found or not uploaded.", "", "", ""
+
+    with metrics.span("load_cases"):
+        upload = uploads.get(file_path)
+    cases, status = upload["cases"], upload["status"]
     if not client_name or not cases:
         return status, "", "", ""
 
-    client_names = [case.get("client", "") for case in cases]
-    client_embeddings = embedder.encode(client_names)
-
-    query_embedding = embedder.encode([client_name])
-    semantic_scores = cosine_similarity(query_embedding, client_embeddings)[0]
-    best_sem_index = np.argmax(semantic_scores)
-    semantic_score = semantic_scores[best_sem_index]
+    # only the query is encoded here; the upload's name vectors come from the cache
+    with metrics.span("semantic"):
+        with metrics.span("encode"):
+            query_embedding = embedindex.normalize(embedder.encode([client_name]))[0]
+        semantic_scores = upload["client_vectors"] @ query_embedding
 
-    fuzzy_scores = [fuzz.partial_ratio(client_name.lower(), name.lower()) for name in client_names]
-    best_fuzzy_index = np.argmax(fuzzy_scores)
-    fuzzy_score = fuzzy_scores[best_fuzzy_index]
+    # the candidates that pass the semantic / fuzzy thresholds are re-scored by the cross-encoder
+    best, confidence = rerank.match_name(reranker.get(), semantic_scores, upload["fuzzy_names"], client_name, cases)
 
-    final_index = best_sem_index if semantic_score > 0.6 else best_fuzzy_index if fuzzy_score > 80 else None
-
-    if final_index is None:
+    if best is None:
         return " No matching case found.", "", "", ""
 
-    case = cases[final_index]
+    case = cases[best["index"]]
     name = case.get("client", "N/A")
+    if not rerank.is_confident(confidence, rerank.MIN_NAME_CONFIDENCE):
+        return f" No confident match (closest: {name}, confidence {confidence:.2f}).", "", "", ""
     charges = ", ".join(case.get("charges", []))
     summary = case.get("summaries", "No summary available.")
 
     # Gemini-based responses
-    if not gemini:
+    if gemini.get() is None:
         return "Gemini API key not found.", summary, "Gemini not available.", "Gemini not available."
 
-    try:
-        simplified = gemini.generate_content(
-            f"Summarize this case in simple terms:\n\n{summary}"
-        ).text
-
-        suggestions = gemini.generate_content(
-            f"You are a legal expert. Based on this case, give next legal steps, key issues, and suggestions:\n\n{summary}"
-        ).text
-
-        answer = ""
-        if question:
-            answer = gemini.generate_content(
-                f"Based on this case:\n\n{summary}\n\nAnswer this question:\n{question}"
-            ).text
-
-    except Exception as e:
-        simplified = f"Gemini Error: {e}"
-        suggestions = "Gemini couldn't provide suggestions."
-        answer = "Gemini couldn't answer the question."
+    prompts = {
+        "simplified": llmcalls.SIMPLIFY_PROMPT.format(summary=summary),
+        "suggestions": f"You are a legal expert. Based on this case, give next legal steps, key issues, and suggestions:\n\n{summary}",
+    }
+    if question:
+        prompts["answer"] = f"Based on this case:\n\n{summary}\n\nAnswer this question:\n{question}"
+
+    # The calls don't depend on each other, so they run concurrently with a timeout each
+    replies = llmcalls.run_prompts(gemini, prompts, {
+        "simplified": "Gemini Error: {error}",
+        "suggestions": "Gemini couldn't provide suggestions.",
+        "answer": "Gemini couldn't answer the question.",
+    })
+    simplified, suggestions, answer = replies["simplified"], replies["suggestions"], replies.get("answer", "")
 
     output_summary = f"**Name**: {name}\n\n**Charges**: {charges}\n\n**Summary**: {summary}"
+    if confidence is not None:
+        output_summary += f"\n\n**Match confidence**: {confidence:.2f}"
     return output_summary, simplified, suggestions, answer
 
-# Gradio Interface
-with gr.Blocks() as iface:
-    gr.Markdown("## ⚖️ Law Firm Case Assistant")
-    gr.Markdown("Upload your case DOCX, enter a client name, and get insights using Gemini AI.")
-
-    file_input = gr.File(label="Upload DOCX Case File (.docx)", file_types=[".docx"])
-    client_input = gr.Textbox(label="Enter Client Name", placeholder="e.g., Meena")
-    question_input = gr.Textbox(label="Ask a Question (Optional)", placeholder="e.g., What should I do next?")
-    submit_btn = gr.Button("Search")
-
-    case_output = gr.Markdown()
-    simplified_output = gr.Markdown()
-    suggestions_output = gr.Markdown()
-    answer_output = gr.Markdown()
-
-    submit_btn.click(
-        fn=case_assistant,
-        inputs=[file_input, client_input, question_input],
-        outputs=[case_output, simplified_output, suggestions_output, answer_output]
-    )
-
-iface.launch()
+# Gradio Interface (gradio is only imported when the UI is built)
+def build_ui():
+    import gradio as gr
+
+    with gr.Blocks() as iface:
+        gr.Markdown("## ⚖️ Law Firm Case Assistant")
+        gr.Markdown("Upload your case DOCX, enter a client name, and get insights using Gemini AI.")
+
+        file_input = gr.File(label="Upload DOCX Case File (.docx)", file_types=[".docx"])
+        client_input = gr.Textbox(label="Enter Client Name", placeholder="e.g., Meena")
+        question_input = gr.Textbox(label="Ask a Question (Optional)", placeholder="e.g., What should I do next?")
+        submit_btn = gr.Button("Search")
+
+        case_output = gr.Markdown()
+        simplified_output = gr.Markdown()
+        suggestions_output = gr.Markdown()
+        answer_output = gr.Markdown()
+
+        submit_btn.click(
+            fn=case_assistant,
+            inputs=[file_input, client_input, question_input],
+            outputs=[case_output, simplified_output, suggestions_output, answer_output]
+        )
+    return iface
+
+if __name__ == "__main__":
+    if lazy.WARM_UP:
+        lazy.warm_up(embedder, reranker, gemini)
+    metrics.serve()
+    build_ui().launch()
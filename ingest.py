@@ -0,0 +1,91 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import casestore
+import json
+import os
+import shutil
+import sys
+import time
+
+# Bulk-load a large folder of Case*.docx files into the case store using every core.
+#   python ingest.py ./archive --workers 8
+# Parsed records are committed to the store as they finish, so an interrupted run
+# keeps its progress; files that fail to parse are moved to a quarantine folder.
+
+# A commit rewrites the whole store, so commits are spaced by time rather than file count:
+# at least COMMIT_SECONDS apart, and further once a commit takes long (a large store), so
+# saving never takes more than about a tenth of the run.
+COMMIT_SECONDS = float(os.getenv("LAWFIRM_INGEST_COMMIT_SECONDS", "30"))
+COMMIT_SHARE = 0.1
+
+
+def quarantine(path, reason, quarantine_dir):
+    os.makedirs(quarantine_dir, exist_ok=True)
+    shutil.move(path, os.path.join(quarantine_dir, os.path.basename(path)))
+    with open(os.path.join(quarantine_dir, "errors.jsonl"), "a", encoding="utf-8") as log:
+        log.write(json.dumps({"file": os.path.basename(path), "error": reason, "time": time.time()}) + "\n")
+
+
+def ingest(folder_path, workers=None, quarantine_dir=None, move_bad_files=True):
+    store = casestore.get_store(folder_path)
+    quarantine_dir = quarantine_dir or os.path.join(folder_path, "quarantine")
+
+    with store.lock:
+        stale, removed = store.pending()
+        total = len(stale)
+        print(f"{total} new or changed files to parse with {workers or os.cpu_count()} workers", file=sys.stderr)
+
+        parsed = failed = 0
+        start = last_report = last_commit = time.monotonic()
+        commit_interval = COMMIT_SECONDS
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(casestore.build_entry, path, mtime, size, store.entries.get(name)): (name, path)
+                for name, path, mtime, size in stale
+            }
+            for future in as_completed(futures):
+                name, path = futures[future]
+                entry = future.result()
+                if "error" in entry:
+                    failed += 1
+                else:
+                    parsed += 1
+                if "error" in entry and move_bad_files:
+                    quarantine(path, entry["error"], quarantine_dir)
+                    store.entries.pop(name, None)
+                else:
+                    store.entries[name] = entry
+
+                now = time.monotonic()
+                if now - last_commit >= commit_interval:
+                    store.commit()
+                    last_commit = time.monotonic()
+                    commit_interval = max(COMMIT_SECONDS, (last_commit - now) / COMMIT_SHARE)
+                    now = last_commit
+                if now - last_report >= 1.0:
+                    last_report = now
+                    rate = (parsed + failed) / (now - start)
+                    print(f"  {parsed + failed}/{total} files, {rate:.0f} files/s, {failed} quarantined", file=sys.stderr)
+
+        if stale or removed:
+            store.commit()
+
+    elapsed = time.monotonic() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"Done: {parsed} parsed, {failed} quarantined in {elapsed:.1f}s ({rate:.0f} files/s); "
+          f"{len(store.cases)} cases in store", file=sys.stderr)
+    return {"parsed": parsed, "failed": failed, "seconds": elapsed, "cases": len(store.cases)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a folder of Case*.docx files into the case store in parallel.")
+    parser.add_argument("folder", help="folder with Case*.docx files")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: all cores)")
+    parser.add_argument("--quarantine", default=None, help="where malformed files go (default: <folder>/quarantine)")
+    parser.add_argument("--keep-bad-files", action="store_true", help="leave malformed files in place, only record them")
+    args = parser.parse_args()
+    ingest(args.folder, args.workers, args.quarantine, move_bad_files=not args.keep_bad_files)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,45 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from rapidfuzz import fuzz
-import numpy as np
-from docx import Document
-from dotenv import load_dotenv
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import casestore
+import csv
+import embedders
+import embedindex
+import fakegemini
+import json
+import lazy
+import llmcalls
+import matcher
 import os
+import sys
 
-# Load environment variables from .env (must include GEMINI_API_KEY)
-load_dotenv(".env")
-api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=api_key)
+# Model for semantic similarity and Gemini, created when a lookup first needs them,
+# so `--help` and bad arguments return at once
+model = lazy.Lazy(embedders.make_embedder, "embedder")  # LAWFIRM_EMBED_BACKEND: torch, onnx or onnx-int8
+gemini = lazy.Lazy(lambda: llmcalls.make_gemini(("GEMINI_API_KEY",)), "gemini")
 
-print("API Key Loaded:", "Yes" if api_key else "No")
-print("Current Directory:", os.getcwd())
 
-# Load model for semantic similarity
-model = SentenceTransformer('all-MiniLM-L6-v2')
+#GEMINI_API_KEY from the environment or .env
+def gemini_key():
+    from dotenv import load_dotenv
+
+    load_dotenv(".env")
+    return os.getenv("GEMINI_API_KEY")
+
+#a real key, or the offline fake client (LAWFIRM_FAKE_GEMINI=1) that needs none
+def gemini_available():
+    return fakegemini.enabled() or bool(gemini_key())
 
 # Function to load and parse cases from a DOCX file
-def load_cases_from_docx(file_path):
+# extractor: "fast" (zip + iterparse) or "python-docx"; both read the same paragraphs
+def load_cases_from_docx(file_path, extractor=None):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    document = Document(file_path)
     cases = []
     current_case = {}
 
-    for para in document.paragraphs:
-        text = para.text.strip()
+    for text in casestore.read_paragraphs(file_path, extractor):
+        text = text.strip()
         if not text:
             continue
 
@@ -54,62 +65,145 @@ def load_cases_from_docx(file_path):
     return cases
 
 # --- USAGE NOTE ---
-# Ensure your cases.docx is in the same folder or update the path below
-docx_path = "cases.docx"
-
-try:
-    cases = load_cases_from_docx(docx_path)
-except FileNotFoundError as e:
-    print(e)
-    exit()
-
-client_names = [case.get("client", "") for case in cases]
-client_embeddings = model.encode(client_names)
-
-client_name = input("\nEnter the client's name: ").strip()
-if not client_name:
-    print("No input provided.")
-    exit()
-
-# Semantic and Fuzzy matching
-query_embedding = model.encode([client_name])
-semantic_scores = cosine_similarity(query_embedding, client_embeddings)[0]
-best_sem_index = np.argmax(semantic_scores)
-semantic_score = semantic_scores[best_sem_index]
-
-fuzzy_scores = [fuzz.partial_ratio(client_name.lower(), name.lower()) for name in client_names]
-best_fuzzy_index = np.argmax(fuzzy_scores)
-fuzzy_score = fuzzy_scores[best_fuzzy_index]
-
-# Match logic
-if semantic_score > 0.6:
-    final_index = best_sem_index
-elif fuzzy_score > 80:
-    final_index = best_fuzzy_index
-else:
-    final_index = None
-
-# Output & Gemini Summary
-if final_index is not None:
-    case = cases[final_index]
-    print("\nClosest Match Found:")
-    print("Name     :", case.get("client", "N/A"))
-    print("Charges  :", ", ".join(case.get("charges", [])))
-    print("Summary  :", case.get("summaries", "No summary available."))
-
-    if api_key and "summaries" in case and case["summaries"]:
-        try:
-            print("\nGemini Summary (Simplified):")
-            prompt = f"Summarize this case in simple terms:\n\n{case['summaries']}"
-            gemini_model = genai.GenerativeModel("gemini-1.5-flash")
-            response = gemini_model.generate_content(prompt)
-
-            if hasattr(response, "text") and response.text:
-                print(response.text)
-            else:
-                print("Gemini didn't return any text. It may be rate limited or empty.")
-
-        except Exception as e:
-            print("Gemini Error:", e)
-else:
-    print("\nNo close match found.")
+# Ensure your cases.docx is in the same folder or pass --docx
+# python lawfirmm.py                        -> asks for one client name
+# python lawfirmm.py --batch names.csv      -> resolves every name in the file (use - for stdin)
+
+
+#client-name embeddings are cached on disk and only recomputed when the .docx changes
+def client_vectors(cases, docx_path):
+    client_names = [case.get("client", "") for case in cases]
+    index = embedindex.EmbeddingIndex(f"cases_docx_clients-{casestore.path_key(docx_path)}", model)
+    return client_names, index.update(client_names, casestore.file_digest(docx_path))
+
+
+def interactive(cases, docx_path):
+    api_key = gemini_available()
+    print("API Key Loaded:", "Yes" if gemini_key() else "No")
+    print("Current Directory:", os.getcwd())
+
+    client_names, client_embeddings = client_vectors(cases, docx_path)
+
+    client_name = input("\nEnter the client's name: ").strip()
+    if not client_name:
+        print("No input provided.")
+        return
+
+    # Semantic and Fuzzy matching
+    match = matcher.match_names([client_name], client_names, client_embeddings, model)[0]
+    final_index = match["index"]
+
+    # Output & Gemini Summary
+    if final_index is not None:
+        case = cases[final_index]
+        print("\nClosest Match Found:")
+        print("Name     :", case.get("client", "N/A"))
+        print("Charges  :", ", ".join(case.get("charges", [])))
+        print("Summary  :", case.get("summaries", "No summary available."))
+
+        if api_key and "summaries" in case and case["summaries"]:
+            try:
+                print("\nGemini Summary (Simplified):")
+                prompt = llmcalls.SIMPLIFY_PROMPT.format(summary=case['summaries'])
+                text = llmcalls.generate(gemini, prompt)
+
+                if text:
+                    print(text)
+                else:
+                    print("Gemini didn't return any text. It may be rate limited or empty.")
+
+            except Exception as e:
+                print("Gemini Error:", e)
+    else:
+        print("\nNo close match found.")
+
+
+#names from a text/CSV file or stdin: the "name" column if there is one, else the first column
+def read_names(path):
+    handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    with handle:
+        rows = [row for row in csv.reader(handle) if row and row[0].strip()]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    column = header.index("name") if "name" in header else 0
+    if "name" in header or header[0] in ("client", "client name"):
+        rows = rows[1:]
+    return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+
+
+def write_results(results, path, fmt):
+    fields = ["query", "client", "charges", "method", "semantic_score", "fuzzy_score", "simplified"]
+    handle = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    with handle:
+        if fmt == "csv":
+            writer = csv.DictWriter(handle, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+        else:
+            for result in results:
+                handle.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+#resolve a whole intake list with one encode call and one fuzzy pass
+def batch(cases, docx_path, args):
+    queries = read_names(args.batch)
+    client_names, client_embeddings = client_vectors(cases, docx_path)
+    matches = matcher.match_names(queries, client_names, client_embeddings, model)
+
+    results = []
+    for query, match in zip(queries, matches):
+        case = cases[match["index"]] if match["index"] is not None else {}
+        results.append({
+            "query": query,
+            "client": case.get("client"),
+            "charges": ", ".join(case.get("charges", [])),
+            "method": match["method"],
+            "semantic_score": round(match["semantic_score"], 4),
+            "fuzzy_score": round(match["fuzzy_score"], 2),
+        })
+
+    if args.summaries and not gemini_available():
+        print("--summaries skipped: no GEMINI_API_KEY in the environment or .env.", file=sys.stderr)
+    elif args.summaries:
+        # each distinct matched case is summarised once, at most --concurrency calls at a time
+        prompts = {}
+        for query, match in zip(queries, matches):
+            if match["index"] is not None and cases[match["index"]].get("summaries"):
+                prompts[match["index"]] = llmcalls.SIMPLIFY_PROMPT.format(summary=cases[match["index"]]["summaries"])
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            replies = llmcalls.run_prompts(gemini, prompts, {i: "Gemini Error: {error}" for i in prompts}, timeout=None, pool=pool)
+        for result, match in zip(results, matches):
+            result["simplified"] = replies.get(match["index"], "")
+
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    write_results(results, args.output, fmt)
+    matched = sum(1 for match in matches if match["index"] is not None)
+    print(f"Matched {matched} of {len(queries)} names.", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the closest case for a client name.")
+    parser.add_argument("--docx", default="cases.docx", help="case file (default: cases.docx)")
+    parser.add_argument("--extractor", choices=["fast", "python-docx"], help="how to read the .docx (default: fast)")
+    parser.add_argument("--batch", metavar="FILE", help="text/CSV file of client names, or - for stdin")
+    parser.add_argument("--output", default="-", help="where batch results go (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="batch output format (default: from --output)")
+    parser.add_argument("--summaries", action="store_true", help="add a Gemini simplified summary per match")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel Gemini calls with --summaries")
+    args = parser.parse_args()
+
+    try:
+        cases = load_cases_from_docx(args.docx, args.extractor)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+
+    if args.batch:
+        batch(cases, args.docx, args)
+    else:
+        interactive(cases, args.docx)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,182 +1,207 @@
-import gradio as gr
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from rapidfuzz import fuzz
-from dotenv import load_dotenv
-from docx import Document
-import google.generativeai as genai
-import numpy as np
-import os
-
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")  # Add your key in .env file as GOOGLE_API_KEY=your_key_here
-genai.configure(api_key=api_key)
-
-gemini = genai.GenerativeModel("gemini-1.5-flash")
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-
-#loading the legal cases
-def load_cases(folder_path="./cases"):  # Place .docx files in a 'cases' folder
-    cases = []
-    for filename in os.listdir(folder_path):
-        if filename.endswith(".docx") and filename.lower().startswith("case"):
-            file_path = os.path.join(folder_path, filename)
-            document = Document(file_path)
-            current_case = {"source": filename, "summaries": "", "charges": []}
-            summary_lines = []
-
-            for para in document.paragraphs:
-                text = para.text.strip()
-                if not text:
-                    continue
-                if " v. " in text and "client" not in current_case:
-                    current_case["client"] = text
-                elif "section" in text.lower() and not current_case["charges"]:
-                    charges = text.split(":", 1)[-1].strip()
-                    current_case["charges"] = [s.strip() for s in charges.split(",")]
-                else:
-                    summary_lines.append(text)
-
-            current_case["summaries"] = "\n".join(summary_lines).strip()
-            if "client" in current_case:
-                cases.append(current_case)
-    return cases
-
-#search by client name
-def case_assistant(client_name, question=""):
-    cases = load_cases()
+import embedders
+import facets
+import lazy
+import lexical
+import llmcalls
+import metrics
+import promptpack
+import rerank
+import ttscache
+import watcher
+
+CASES_FOLDER = "./cases"  # Place .docx files in a 'cases' folder
+
+# gradio, Gemini, the embedder and the case indexes are only loaded on first use
+# (or by the warm-up thread started at launch), so importing this module is fast
+gemini = lazy.Lazy(lambda: llmcalls.make_gemini(("GOOGLE_API_KEY",)), "gemini")  # Add your key in .env file as GOOGLE_API_KEY=your_key_here
+embedder = lazy.Lazy(embedders.make_embedder, "embedder")  # LAWFIRM_EMBED_BACKEND: torch, onnx or onnx-int8
+
+# the case folder is watched in the background; searches read the latest ready snapshot
+case_watcher = lazy.Lazy(lambda: watcher.CaseWatcher(CASES_FOLDER, embedder).start(), "case_watcher")
+# cross-encoder that re-scores the top candidates (LAWFIRM_RERANK_MODEL=off disables it)
+reranker = lazy.Lazy(rerank.make_reranker, "reranker")
+tts_cache = ttscache.get_cache()
+
+#search by client name (a generator, so Gradio can stream the Gemini replies)
+@metrics.instrument("case_assistant")
+def case_assistant(client_name, question="", filters=None):
+    snapshot = case_watcher.current()
+    cases = snapshot.cases if snapshot else []
     if not client_name or not cases:
-        return "Please enter a valid client name or ensure cases are loaded.", "", "", ""
-
-    client_names = [case.get("client", "") for case in cases]
-    client_embeddings = embedder.encode(client_names)
-    query_embedding = embedder.encode([client_name])
-    semantic_scores = cosine_similarity(query_embedding, client_embeddings)[0]
-    best_sem_index = np.argmax(semantic_scores)
-    semantic_score = semantic_scores[best_sem_index]
-    fuzzy_scores = [fuzz.partial_ratio(client_name.lower(), name.lower()) for name in client_names]
-    best_fuzzy_index = np.argmax(fuzzy_scores)
-    fuzzy_score = fuzzy_scores[best_fuzzy_index]
-
-    final_index = best_sem_index if semantic_score > 0.6 else best_fuzzy_index if fuzzy_score > 80 else None
-
-    if final_index is None:
-        return "No matching case found.", "", "", ""
-
-    case = cases[final_index]
+        yield "Please enter a valid client name or ensure cases are loaded.", "", "", ""
+        return
+
+    # filters (section, party type, year) pick the candidate cases before anything is scored
+    allowed = snapshot.facets.filter(**filters) if filters else None
+    if allowed is not None and not len(allowed):
+        yield "No case matches the filters.", "", "", ""
+        return
+
+    # stage 1: every case that passes the old semantic / fuzzy thresholds; stage 2: the cross-encoder orders them
+    semantic_scores = snapshot.name_index.scores(client_name, rows=allowed)
+    best, confidence = rerank.match_name(reranker.get(), semantic_scores, snapshot.fuzzy_names, client_name, cases, allowed)
+    if best is None:
+        yield "No matching case found.", "", "", ""
+        return
+
+    case = cases[best["index"]]
     name = case.get("client", "N/A")
+    # a weak match is reported as such and never reaches Gemini
+    if not rerank.is_confident(confidence, rerank.MIN_NAME_CONFIDENCE):
+        yield f"No confident match (closest: {name}, confidence {confidence:.2f}).", "", "", ""
+        return
     charges = ", ".join(case.get("charges", []))
     summary = case.get("summaries", "No summary available.")
 
-    try:
-        simplified = gemini.generate_content(f"Summarize this case in simple terms:\n\n{summary}").text
-        suggestions = gemini.generate_content(f"You are a legal expert. Based on this case, give next legal steps, key issues, and suggestions.\n\n{summary}").text
-        answer = ""
-        if question:
-            qa_prompt = f"Based on this case:\n\n{summary}\n\nAnswer this question:\n{question}"
-            answer = gemini.generate_content(qa_prompt).text
-    except Exception as e:
-        simplified = f"Gemini Error: {e}"
-        suggestions = "Gemini couldn't provide suggestions."
-        answer = "Gemini couldn't answer the question."
-
     output_summary = f"**Name**: {name}\n\n**Charges**: {charges}\n\n**Summary**: {summary}"
-    return output_summary, simplified, suggestions, answer
+    if confidence is not None:
+        output_summary += f"\n\n**Match confidence**: {confidence:.2f}"
+    yield output_summary, "", "", ""
+
+    # the Gemini calls are independent, so they run side by side and stream into their panes
+    prompts = {
+        "simplified": llmcalls.SIMPLIFY_PROMPT.format(summary=summary),
+        "suggestions": f"You are a legal expert. Based on this case, give next legal steps, key issues, and suggestions.\n\n{summary}",
+    }
+    if question:
+        prompts["answer"] = f"Based on this case:\n\n{summary}\n\nAnswer this question:\n{question}"
+    fallbacks = {
+        "simplified": "Gemini Error: {error}",
+        "suggestions": "Gemini couldn't provide suggestions.",
+        "answer": "Gemini couldn't answer the question.",
+    }
+    for replies in llmcalls.stream_prompts(gemini, prompts, fallbacks):
+        yield output_summary, replies["simplified"], replies["suggestions"], replies.get("answer", "")
 
 #query to case match
-def query_to_case_match(query, top_k=3):
+@metrics.instrument("query_to_case_match")
+def query_to_case_match(query, top_k=3, filters=None):
     if not query:
-        return "Please enter a legal query.", "", "", ""
+        yield "Please enter a legal query.", "", "", ""
+        return
 
-    cases = load_cases()
+    snapshot = case_watcher.current()
+    cases = snapshot.cases if snapshot else []
     if not cases:
-        return "No cases available.", "", "", ""
-
-    combined_summaries = [f"{case.get('client', '')}: {case['summaries']}" for case in cases]
-    summary_embeddings = embedder.encode(combined_summaries)
-    query_embedding = embedder.encode([query])
-    similarity_scores = cosine_similarity(query_embedding, summary_embeddings)[0]
-
-    top_indices = np.argsort(similarity_scores)[::-1][:top_k]
+        yield "No cases available.", "", "", ""
+        return
+
+    # long judgments are indexed as overlapping chunks; Gemini only sees the best-scoring ones.
+    # BM25 and the dense ranking are fused, and bare section queries skip the embedder entirely
+    allowed = snapshot.facets.filter(**filters) if filters else None
+    # with a reranker, more candidates are retrieved and only the confident top_k go to Gemini
+    depth = rerank.RERANK_CANDIDATES if reranker.get() is not None else top_k
+    matches = lexical.hybrid_search(query, snapshot.chunk_index, snapshot.lexical_index, max(depth, top_k), allowed=allowed)
+    if not matches:
+        yield "No case matches the query and filters.", "", "", ""
+        return
+    ranked = rerank.rerank(reranker.get(), query, matches, [rerank.case_passage(cases[idx], chunks) for idx, _, chunks in matches])
+    ranked = [(match, confidence) for match, confidence in ranked if rerank.is_confident(confidence)][:top_k]
+    if not ranked:
+        yield "No case is a confident match for this query; try more specific terms.", "", "", ""
+        return
 
     results = []
-    full_text = ""
-    for idx in top_indices:
+    for (idx, _, chunks), confidence in ranked:
         case = cases[idx]
-        name = case.get("client", "N/A")
-        charges = ", ".join(case.get("charges", []))
-        summary = case.get("summaries", "No summary available.")
-        try:
-            simplified = gemini.generate_content(f"Summarize this case in simple terms:\n\n{summary}").text
-        except:
-            simplified = "Could not generate simplified summary."
-
-        results.append({"name": name, "charges": charges, "summary": summary, "simplified": simplified})
-        full_text += f"### 🔹 Case: {name}\n**Charges**: {charges}\n\n**Summary**:\n{simplified}\n\n---\n"
-
-    try:
-        combined_text = "\n\n".join([r["summary"] for r in results])
-        qa_prompt = f"Based on the following legal cases:\n\n{combined_text}\n\nAnswer this query:\n{query}"
-        answer = gemini.generate_content(qa_prompt).text
-    except:
-        answer = "Could not generate an answer using Gemini."
-
-    return full_text, "", "", answer
-
-#text to speech
+        results.append({"name": case.get("client", "N/A"), "charges": ", ".join(case.get("charges", [])), "texts": chunks,
+                        "confidence": confidence})
+
+    # one Gemini request returns every case summary and the answer, within LAWFIRM_PROMPT_TOKENS
+    prompt, packed = promptpack.pack_cases(query, results)
+
+    def render(sections, done=False):
+        full_text = ""
+        for i, r in enumerate(results):
+            if i >= packed:
+                summary = "_Not summarized: the prompt budget was used by the better matches._"
+            else:
+                summary = sections.get(i) or ("Could not generate simplified summary." if done else "…")
+            confidence = f" (confidence {r['confidence']:.2f})" if r["confidence"] is not None else ""
+            full_text += f"### 🔹 Case: {r['name']}{confidence}\n**Charges**: {r['charges']}\n\n**Summary**:\n{summary}\n\n---\n"
+        return full_text
+
+    # the matched cases show up first; the summaries and the answer then stream in as sections of one reply
+    yield render({}), "", "", ""
+    sections = {}
+    for replies in llmcalls.stream_prompts(gemini, {"packed": prompt}, {"packed": "Could not generate an answer using Gemini."}):
+        sections = promptpack.parse_reply(replies["packed"])
+        yield render(sections), "", "", sections.get("answer", "")
+    if any(i not in sections for i in range(packed)):
+        yield render(sections, done=True), "", "", sections.get("answer", "")
+
+#text to speech: a file in the TTS cache, mostly synthesized already while the answer streamed in
+@metrics.instrument("generate_tts")
 def generate_tts(text):
-    from gtts import gTTS
-    from tempfile import NamedTemporaryFile
-    if not text.strip():
-        return None
-    tts = gTTS(text=text, lang='en')
-    temp_file = NamedTemporaryFile(delete=False, suffix=".mp3")
-    tts.save(temp_file.name)
-    return temp_file.name
-
-with gr.Blocks(css="lawfirm.css") as iface:
-    gr.Markdown("# ⚖️ Law Firm Case Assistant", elem_id="header")
-    gr.Markdown("Choose how you want to search legal cases:")
-
-    search_mode = gr.Radio(["Search by Client Name", "Search by Legal Query"], value="Search by Client Name", label="Choose Mode")
-
-    client_input = gr.Textbox(label="Enter Client Name", placeholder="e.g., Meena", visible=True)
-    question_input = gr.Textbox(label="Ask a Question", placeholder="e.g., What should I do next?", visible=True)
-    query_input = gr.Textbox(label="Enter Legal Query", placeholder="e.g., Who got life imprisonment for dowry?", visible=False)
-
-    search_mode.change(
-        fn=lambda mode: (
-            gr.update(visible=(mode == "Search by Client Name")),
-            gr.update(visible=(mode == "Search by Client Name")),
-            gr.update(visible=(mode == "Search by Legal Query"))
-        ),
-        inputs=search_mode,
-        outputs=[client_input, question_input, query_input]
-    )
-
-    submit_btn = gr.Button("Search")
-
-    case_output = gr.Markdown()
-    simplified_output = gr.Markdown()
-    suggestions_output = gr.Markdown()
-    answer_output = gr.Textbox(visible=False)
-    audio_output = gr.Audio(label="Hear the Answer", type="filepath", autoplay=True)
-
-    def main_dispatch(mode, client, ques, query):
-        if mode == "Search by Client Name":
-            return case_assistant(client, ques)
-        elif mode == "Search by Legal Query":
-            return query_to_case_match(query)
-
-    submit_btn.click(
-        fn=main_dispatch,
-        inputs=[search_mode, client_input, question_input, query_input],
-        outputs=[case_output, simplified_output, suggestions_output, answer_output]
-    ).then(
-        fn=generate_tts,
-        inputs=answer_output,
-        outputs=audio_output,
-        preprocess=False
-    )
-
-iface.launch()
+    with metrics.span("tts"):
+        return tts_cache.synthesize(text or "")
+
+@metrics.instrument("main_dispatch")
+def main_dispatch(mode, client, ques, query, section="", party="", year=""):
+    filters = facets.parse_filters(section, party, year)
+    if mode == "Search by Client Name":
+        results = case_assistant(client, ques, filters)
+    elif mode == "Search by Legal Query":
+        results = query_to_case_match(query, filters=filters)
+    else:
+        return
+    for outputs in results:
+        # finished sentences of the answer go to the TTS workers before the answer is complete
+        tts_cache.prefetch(outputs[3])
+        yield outputs
+
+#the Gradio app; gradio itself is only imported once the UI is built
+def build_ui():
+    import gradio as gr
+
+    with gr.Blocks(css="lawfirm.css") as iface:
+        gr.Markdown("# ⚖️ Law Firm Case Assistant", elem_id="header")
+        gr.Markdown("Choose how you want to search legal cases:")
+
+        search_mode = gr.Radio(["Search by Client Name", "Search by Legal Query"], value="Search by Client Name", label="Choose Mode")
+
+        client_input = gr.Textbox(label="Enter Client Name", placeholder="e.g., Meena", visible=True)
+        question_input = gr.Textbox(label="Ask a Question", placeholder="e.g., What should I do next?", visible=True)
+        query_input = gr.Textbox(label="Enter Legal Query", placeholder="e.g., Who got life imprisonment for dowry?", visible=False)
+
+        with gr.Row():
+            section_filter = gr.Textbox(label="Section", placeholder="e.g., IPC 498A")
+            party_filter = gr.Dropdown(["any"] + list(facets.PARTY_TYPES), value="any", label="Party type")
+            year_filter = gr.Textbox(label="Year", placeholder="e.g., 2020 or 2015-2020")
+
+        search_mode.change(
+            fn=lambda mode: (
+                gr.update(visible=(mode == "Search by Client Name")),
+                gr.update(visible=(mode == "Search by Client Name")),
+                gr.update(visible=(mode == "Search by Legal Query"))
+            ),
+            inputs=search_mode,
+            outputs=[client_input, question_input, query_input]
+        )
+
+        submit_btn = gr.Button("Search")
+
+        case_output = gr.Markdown()
+        simplified_output = gr.Markdown()
+        suggestions_output = gr.Markdown()
+        answer_output = gr.Textbox(visible=False)
+        audio_output = gr.Audio(label="Hear the Answer", type="filepath", autoplay=True)
+
+        submit_btn.click(
+            fn=main_dispatch,
+            inputs=[search_mode, client_input, question_input, query_input, section_filter, party_filter, year_filter],
+            outputs=[case_output, simplified_output, suggestions_output, answer_output]
+        ).then(
+            fn=generate_tts,
+            inputs=answer_output,
+            outputs=audio_output,
+            preprocess=False
+        )
+    return iface
+
+if __name__ == "__main__":
+    if lazy.WARM_UP:
+        # models and indexes load while Gradio starts up
+        lazy.warm_up(embedder, case_watcher, reranker, gemini)
+    metrics.serve()
+    build_ui().launch()
@@ -0,0 +1,59 @@
+import metrics
+import os
+import threading
+import time
+
+# Models and other slow-to-build objects created on first use instead of at import,
+# so `--help`, a fuzzy-only lookup or a UI that is still booting doesn't pay for them.
+#   embedder = lazy.Lazy(embedders.make_embedder, "embedder")
+#   embedder.encode(texts)     # builds the embedder here, once, then forwards
+#   lazy.warm_up(embedder)     # or build it in the background right away
+
+# LAWFIRM_WARM_UP=0 leaves everything to first use
+WARM_UP = os.getenv("LAWFIRM_WARM_UP", "1") != "0"
+
+
+class Lazy:
+    """Calls `factory` the first time the value is needed (once, even with several
+    threads asking) and forwards attribute access to the result.
+    """
+
+    def __init__(self, factory, name=None):
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", "value")
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self._factory()
+                    metrics.observe("lawfirm_load_seconds", time.perf_counter() - start, component=self._name)
+                    self._loaded = True
+        return self._value
+
+    def loaded(self):
+        return self._loaded
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __repr__(self):
+        return f"<Lazy {self._name} {'loaded' if self._loaded else 'not loaded'}>"
+
+
+#build the given values in a background thread; a failure is printed and retried on first use
+def warm_up(*values):
+    def run():
+        for value in values:
+            try:
+                value.get()
+            except Exception as e:
+                print(f"Warm-up: could not load {value._name} ({e})")
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
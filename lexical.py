@@ -0,0 +1,178 @@
+from collections import Counter
+import math
+import facets
+import metrics
+import numpy as np
+import re
+
+# Keyword side of query search: BM25 over case text and charges, reciprocal-rank
+# fusion with the dense chunk ranking, and a charges -> cases lookup that answers
+# bare section-number queries ("IPC §498A", "section 302 and 34") with no embedding at all.
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+# candidates taken from each ranking before fusing
+FUSION_DEPTH = 50
+
+STOPWORDS = frozenset("a an and are as at be by for from has have in is it its of on or that the this to was were with who what which".split())
+# words that may surround section numbers in a "pure section" query
+SECTION_WORDS = frozenset("""ipc crpc cr p c cpc it act hma id sec section sections s u us under art article articles and of the no
+    indian penal code criminal civil procedure information technology hindu marriage industrial disputes
+    payment gratuity consumer protection constitution""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SECTION = re.compile(r"^\d{1,4}[a-z]{0,2}$")
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+#the canonical section keys of a query made of nothing but section references, else None
+def pure_section_query(query):
+    tokens = _TOKEN.findall(query.lower())
+    # the "a" of "498-A" / "498 A" is the section's suffix
+    suffix = lambda i: i and len(tokens[i]) <= 2 and tokens[i].isalpha() and tokens[i - 1].isdigit()
+    if any(_SECTION.match(t) for t in tokens) and all(t in SECTION_WORDS or _SECTION.match(t) or suffix(i)
+                                                      for i, t in enumerate(tokens)):
+        return facets.section_filter_keys(query) or None
+    return None
+
+
+class BM25Index:
+    """Okapi BM25 over tokenized documents; a query only touches the postings of its own terms."""
+
+    def __init__(self, docs, k1=BM25_K1, b=BM25_B):
+        postings = {}
+        lengths = np.zeros(len(docs), dtype=np.float32)
+        for doc_id, tokens in enumerate(docs):
+            lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc_id)
+                postings[term][1].append(tf)
+        self.size = len(docs)
+        average = float(lengths.mean()) if len(docs) else 0.0
+        # per-document part of the BM25 denominator, computed once
+        self.norms = k1 * (1 - b + b * lengths / average) if average else np.full(len(docs), k1, dtype=np.float32)
+        self.k1 = k1
+        self.postings = {}
+        for term, (ids, tfs) in postings.items():
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            self.postings[term] = (np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.float32), idf)
+
+    #(doc ids, scores) of the best k documents containing any query term; `allowed` (sorted ids)
+    #limits the search to those documents
+    def search(self, query_tokens, k, allowed=None):
+        entries = [self.postings[term] for term in set(query_tokens) if term in self.postings]
+        if allowed is not None:
+            allowed = np.asarray(allowed, dtype=np.int64)
+            # a filter narrower than the postings is cheaper to score on its own than the whole corpus
+            if len(allowed) * 4 < sum(len(ids) for ids, _, _ in entries):
+                return self._search_allowed(entries, k, allowed)
+        scores = np.zeros(self.size, dtype=np.float32)
+        for ids, tfs, idf in entries:
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self.norms[ids])
+        if allowed is not None:
+            candidates = allowed[scores[allowed] > 0]
+        else:
+            candidates = np.flatnonzero(scores)
+        return self._best(candidates, scores[candidates], k)
+
+    #scores only the allowed documents: each posting list is intersected with `allowed`
+    def _search_allowed(self, entries, k, allowed):
+        scores = np.zeros(len(allowed), dtype=np.float32)
+        for ids, tfs, idf in entries:
+            postings, rows = intersect_sorted(ids, allowed)
+            tfs = tfs[postings]
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + self.norms[ids[postings]])
+        hits = np.flatnonzero(scores)
+        return self._best(allowed[hits], scores[hits], k)
+
+    def _best(self, candidates, scores, k):
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order].tolist(), scores[order].tolist()
+
+
+#(positions in `a`, positions in `b`) of the values both sorted arrays share; the shorter one is
+#binary-searched in the longer, so a short posting list or a narrow filter costs about its own length
+def intersect_sorted(a, b):
+    if len(a) > len(b):
+        in_b, in_a = intersect_sorted(b, a)
+        return in_a, in_b
+    positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    found = b[positions] == a
+    return np.flatnonzero(found), positions[found]
+
+
+class CaseLexicalIndex:
+    """BM25 over each case (title, charges and summary) plus canonical section key -> case ids."""
+
+    def __init__(self, cases):
+        docs = []
+        self.sections = {}
+        for i, case in enumerate(cases):
+            charges = " ".join(case.get("charges", []))
+            docs.append(tokenize(f"{case.get('client', '')} {charges} {case.get('summaries', '')}"))
+            for key in facets.case_sections(case):
+                self.sections.setdefault(key, []).append(i)
+        self.bm25 = BM25Index(docs)
+
+    def search(self, query, k, allowed=None):
+        return self.bm25.search(tokenize(query), k, allowed)
+
+    #cases that carry every one of the given sections
+    def cases_with_sections(self, keys):
+        matches = None
+        for key in keys:
+            ids = set(self.sections.get(key, ()))
+            matches = ids if matches is None else matches & ids
+        return sorted(matches or ())
+
+
+#reciprocal-rank fusion of several rankings (lists of ids, best first)
+def rrf(rankings, k=RRF_K):
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+#chunks of a case that share the most terms with the query
+def best_chunks(chunk_index, case, query, per_case=2):
+    terms = set(tokenize(query))
+    rows = chunk_index.case_rows(case)
+    ranked = sorted(rows, key=lambda row: -len(terms & set(tokenize(chunk_index.chunks[row]))))
+    return [chunk_index.chunks[row] for row in ranked[:per_case]]
+
+
+#[(case index, score, chunks)] for a legal query, like ChunkIndex.search but hybrid;
+#`allowed` (sorted case ids from FacetIndex.filter) limits every stage to those cases
+def hybrid_search(query, chunk_index, lexical_index, top_k=3, per_case=2, allowed=None):
+    if allowed is not None and not len(allowed):
+        return []
+    sections = pure_section_query(query)
+    if sections:
+        with metrics.span("sections"):
+            matches = lexical_index.cases_with_sections(sections)
+            if allowed is not None:
+                matches = sorted(set(matches) & set(allowed.tolist()))
+        if matches:
+            # rank the statute hits by BM25; the embedder is never called
+            with metrics.span("bm25"):
+                ranked, scores = lexical_index.bm25.search(tokenize(query), top_k, allowed=matches)
+            ranked += [case for case in matches if case not in ranked][:top_k - len(ranked)]
+            scores += [0.0] * (len(ranked) - len(scores))
+            return [(case, score, best_chunks(chunk_index, case, query, per_case)) for case, score in zip(ranked, scores)]
+
+    with metrics.span("bm25"):
+        lexical_ranking, _ = lexical_index.search(query, FUSION_DEPTH, allowed)
+    dense = chunk_index.search(query, FUSION_DEPTH, per_case, cases=allowed)
+    dense_chunks = {case: chunks for case, _, chunks in dense}
+    fused = rrf([[case for case, _, _ in dense], lexical_ranking])[:top_k]
+    return [(case, score, dense_chunks.get(case) or best_chunks(chunk_index, case, query, per_case)) for case, score in fused]
@@ -0,0 +1,127 @@
+from casestore import CACHE_DIR
+from collections import OrderedDict
+import hashlib
+import metrics
+import os
+import sqlite3
+import threading
+import time
+
+# in-memory entries, disk entries and seconds a reply stays valid
+LLM_CACHE_SIZE = int(os.getenv("LAWFIRM_LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_DISK_SIZE = int(os.getenv("LAWFIRM_LLM_CACHE_DISK_SIZE", "100000"))
+LLM_CACHE_TTL = float(os.getenv("LAWFIRM_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# SQLite file for the disk tier; "off" keeps the cache in memory only
+LLM_CACHE_PATH = os.getenv("LAWFIRM_LLM_CACHE", os.path.join(CACHE_DIR, "llm_cache.sqlite"))
+
+
+def model_name(model):
+    return getattr(model, "model_name", type(model).__name__)
+
+
+#content address of a reply: the model plus the hash of the full prompt (template + input)
+def make_key(model, prompt):
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model_name(model)}\0{prompt_hash}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of LLM replies: an LRU dict in memory backed by SQLite."""
+
+    def __init__(self, max_entries=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, db_path=LLM_CACHE_PATH, max_db_entries=LLM_CACHE_DISK_SIZE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.db = None
+        if db_path and db_path != "off":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS replies (key TEXT PRIMARY KEY, text TEXT, created REAL, used REAL)")
+            self.db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                metrics.inc("lawfirm_cache_hits_total", cache="llm_memory")
+                return entry[0]
+            if entry:
+                del self.memory[key]
+
+            if self.db is not None:
+                row = self.db.execute("SELECT text, created FROM replies WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    self.db.execute("UPDATE replies SET used = ? WHERE key = ?", (now, key))
+                    self.db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    metrics.inc("lawfirm_cache_hits_total", cache="llm_disk")
+                    return row[0]
+
+            self.misses += 1
+            metrics.inc("lawfirm_cache_misses_total", cache="llm")
+            return None
+
+    def put(self, key, text):
+        now = time.time()
+        with self.lock:
+            self._remember(key, text, now)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?)", (key, text, now, now))
+                self.db.execute("DELETE FROM replies WHERE created < ?", (now - self.ttl,))
+                # drop the least recently used rows once the table is over its limit
+                self.db.execute(
+                    "DELETE FROM replies WHERE key IN (SELECT key FROM replies ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_db_entries,),
+                )
+                self.db.commit()
+
+    def _remember(self, key, text, created):
+        self.memory[key] = (text, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "memory_entries": len(self.memory)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+# python llmcache.py ./cases -- fill the cache with simplified summaries for a whole folder
+if __name__ == "__main__":
+    import argparse
+    import casestore
+    import llmcalls
+
+    parser = argparse.ArgumentParser(description="Pre-warm the Gemini reply cache with simplified case summaries.")
+    parser.add_argument("folder", help="folder with Case*.docx files")
+    parser.add_argument("--model", default="gemini-1.5-flash")
+    args = parser.parse_args()
+
+    gemini = llmcalls.make_gemini(model=args.model)
+
+    cases = casestore.load_cases(args.folder)
+    prompts = {i: llmcalls.SIMPLIFY_PROMPT.format(summary=case["summaries"]) for i, case in enumerate(cases)}
+    replies = llmcalls.run_prompts(gemini, prompts, {i: "" for i in prompts}, timeout=None)
+    failed = sum(1 for text in replies.values() if not text)
+    print(f"Pre-warmed {len(cases) - failed} of {len(cases)} summaries. {llmcalls.llmcache.get_cache().stats()}")
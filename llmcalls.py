@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+import fakegemini
+import llmcache
+import metrics
+import os
+import queue
+import time
+
+# seconds each Gemini call may take before its fallback text is used instead
+GEMINI_TIMEOUT = float(os.getenv("LAWFIRM_GEMINI_TIMEOUT", "30"))
+GEMINI_WORKERS = int(os.getenv("LAWFIRM_GEMINI_WORKERS", "8"))
+# a failed call is tried again this many times, waiting GEMINI_RETRY_DELAY, then twice that, ...
+GEMINI_RETRIES = int(os.getenv("LAWFIRM_GEMINI_RETRIES", "2"))
+GEMINI_RETRY_DELAY = float(os.getenv("LAWFIRM_GEMINI_RETRY_DELAY", "0.5"))
+
+SIMPLIFY_PROMPT = "Summarize this case in simple terms:\n\n{summary}"
+
+_pool = ThreadPoolExecutor(max_workers=GEMINI_WORKERS, thread_name_prefix="gemini")
+
+
+#the Gemini model (or the offline stand-in with LAWFIRM_FAKE_GEMINI=1); the SDK is only imported here.
+#With `require_key`, None is returned when none of `key_names` is set
+def make_gemini(key_names=("GEMINI_API_KEY", "GOOGLE_API_KEY"), model="gemini-1.5-flash", require_key=False):
+    if fakegemini.enabled():
+        return fakegemini.FakeGemini()
+    from dotenv import load_dotenv
+    import google.generativeai as genai
+
+    load_dotenv()
+    api_key = next((os.getenv(name) for name in key_names if os.getenv(name)), None)
+    if require_key and not api_key:
+        return None
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model)
+
+
+#wait before the next attempt, or re-raise once the retries are used up
+def _retry_or_raise(attempt):
+    if attempt >= GEMINI_RETRIES:
+        raise
+    metrics.inc("lawfirm_gemini_retries_total")
+    time.sleep(GEMINI_RETRY_DELAY * 2 ** attempt)
+
+
+#one Gemini call, answered from the reply cache when the same prompt was seen before
+def generate(model, prompt):
+    cache = llmcache.get_cache()
+    key = llmcache.make_key(model, prompt)
+    text = cache.get(key)
+    if text is None:
+        metrics.inc("lawfirm_gemini_calls_total")
+        start = time.perf_counter()
+        for attempt in range(GEMINI_RETRIES + 1):
+            try:
+                text = model.generate_content(prompt).text
+                break
+            except Exception:
+                _retry_or_raise(attempt)
+        metrics.observe("lawfirm_gemini_call_seconds", time.perf_counter() - start)
+        # an empty reply (e.g. blocked by a safety filter) is asked again next time, not served for the TTL
+        if text:
+            cache.put(key, text)
+    return text
+
+
+#run independent prompts side by side and return whatever finished in time
+@metrics.timed("gemini")
+def run_prompts(model, prompts, fallbacks, timeout=GEMINI_TIMEOUT, pool=None):
+    """`prompts` and `fallbacks` are dicts keyed the same way. A call that fails
+    or times out gets its fallback text, where "{error}" is replaced by the reason.
+    Pass your own `pool` to cap how many calls run at once.
+    """
+    pool = pool or _pool
+    futures = {key: pool.submit(generate, model, prompt) for key, prompt in prompts.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    results = {}
+    for key, future in futures.items():
+        if future not in done:
+            future.cancel()
+            error = f"timed out after {timeout:g}s"
+            metrics.inc("lawfirm_gemini_errors_total", reason="timeout")
+        elif future.exception() is not None:
+            error = future.exception()
+            metrics.inc("lawfirm_gemini_errors_total", reason="error")
+        else:
+            results[key] = future.result()
+            continue
+        results[key] = fallbacks[key].format(error=error)
+    return results
+
+
+_DONE = object()
+
+
+def chunk_text(chunk):
+    # chunks that carry no text (e.g. only a finish reason) raise ValueError on .text
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def _stream_one(model, key, prompt, updates):
+    try:
+        cache = llmcache.get_cache()
+        cache_key = llmcache.make_key(model, prompt)
+        text = cache.get(cache_key)
+        if text is not None:
+            updates.put((key, text, None))
+        else:
+            metrics.inc("lawfirm_gemini_calls_total")
+            start = time.perf_counter()
+            parts = []
+            for attempt in range(GEMINI_RETRIES + 1):
+                try:
+                    for chunk in model.generate_content(prompt, stream=True):
+                        text = chunk_text(chunk)
+                        if text:
+                            parts.append(text)
+                            updates.put((key, text, None))
+                    break
+                except Exception:
+                    # text already shown can't be taken back, so only a stream that failed before its first chunk is retried
+                    if parts:
+                        raise
+                    _retry_or_raise(attempt)
+            metrics.observe("lawfirm_gemini_call_seconds", time.perf_counter() - start)
+            if parts:
+                cache.put(cache_key, "".join(parts))
+        updates.put((key, _DONE, None))
+    except Exception as e:
+        updates.put((key, _DONE, e))
+
+
+#like run_prompts, but yields the texts so far every time any of the streams grows
+@metrics.timed("gemini")
+def stream_prompts(model, prompts, fallbacks, timeout=GEMINI_TIMEOUT):
+    updates = queue.Queue()
+    texts = {key: "" for key in prompts}
+    pending = set(prompts)
+    for key, prompt in prompts.items():
+        _pool.submit(_stream_one, model, key, prompt, updates)
+
+    deadline = time.monotonic() + timeout
+    while pending:
+        try:
+            key, text, error = updates.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            for key in pending:
+                texts[key] = texts[key] or fallbacks[key].format(error=f"timed out after {timeout:g}s")
+                metrics.inc("lawfirm_gemini_errors_total", reason="timeout")
+            yield dict(texts)
+            return
+        if text is _DONE:
+            pending.discard(key)
+            if error is not None:
+                texts[key] = fallbacks[key].format(error=error)
+                metrics.inc("lawfirm_gemini_errors_total", reason="error")
+        else:
+            texts[key] += text
+        yield dict(texts)
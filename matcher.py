@@ -0,0 +1,139 @@
+from embedindex import normalize
+from rapidfuzz import fuzz, process
+import metrics
+import numpy as np
+
+# same cut-offs the apps have always used
+SEMANTIC_THRESHOLD = 0.6
+FUZZY_THRESHOLD = 80
+# n-gram candidate pruning is only worth it on big name lists
+PRUNE_MIN_NAMES = 20000
+
+
+def normalize_name(name):
+    return " ".join(name.lower().split())
+
+
+def ngrams(text, n=3):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+#fuzzy scores of every query against every client name in one multi-core pass
+def fuzzy_matrix(queries, names, workers=-1):
+    return process.cdist(
+        [normalize_name(q) for q in queries], [normalize_name(n) for n in names],
+        scorer=fuzz.partial_ratio, processor=None, dtype=np.float32, workers=workers,
+    )
+
+
+# Pick a case per query: semantic winner above 0.6, else fuzzy winner above 80
+def pick_matches(semantic_scores, fuzzy_scores):
+    rows = np.arange(len(semantic_scores))
+    best_sem = np.argmax(semantic_scores, axis=1)
+    best_fuzzy = np.argmax(fuzzy_scores, axis=1)
+    sem = semantic_scores[rows, best_sem]
+    fuzzy = fuzzy_scores[rows, best_fuzzy]
+
+    matches = []
+    for i in rows:
+        if sem[i] > SEMANTIC_THRESHOLD:
+            index, method = int(best_sem[i]), "semantic"
+        elif fuzzy[i] > FUZZY_THRESHOLD:
+            index, method = int(best_fuzzy[i]), "fuzzy"
+        else:
+            index, method = None, None
+        matches.append({
+            "index": index,
+            "method": method,
+            "semantic_score": float(sem[i]),
+            "fuzzy_score": float(fuzzy[i]),
+        })
+    return matches
+
+
+#match many client names at once; `name_vectors` are unit-length embeddings of `names`
+def match_names(queries, names, name_vectors, embedder):
+    if not queries or not names:
+        return [{"index": None, "method": None, "semantic_score": 0.0, "fuzzy_score": 0.0} for _ in queries]
+    query_vectors = normalize(embedder.encode(list(queries)))
+    semantic_scores = query_vectors @ np.asarray(name_vectors, dtype=np.float32).T
+    return pick_matches(semantic_scores, fuzzy_matrix(queries, names))
+
+
+class FuzzyNameIndex:
+    """Client names normalized once, plus a character n-gram inverted index that
+    narrows the names worth handing to rapidfuzz for a query.
+    """
+
+    def __init__(self, names, n=3):
+        self.names = [normalize_name(name) for name in names]
+        self.n = n
+        postings = {}
+        name_grams = []
+        for i, name in enumerate(self.names):
+            grams = ngrams(name, n)
+            name_grams.append(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        # grams found in most names (" v. ", "sta") say little about a match, rare ones a lot
+        self.idf = {gram: float(np.log(1 + len(self.names) / len(ids))) for gram, ids in postings.items()}
+        self.name_weights = np.array([sum(self.idf[gram] for gram in grams) for grams in name_grams], dtype=np.float32)
+
+    #names whose shared n-grams carry at least `min_share` of the query's idf weight (or of their own,
+    #for names shorter than the query), or None if the query can't be pruned
+    def candidates(self, query, min_share=0.3):
+        grams = [gram for gram in ngrams(query, self.n) if gram in self.postings]
+        if not grams:
+            return None
+        # grams the query has but no name has count towards neither side
+        weights = [self.idf[gram] for gram in grams]
+        hits = np.bincount(np.concatenate([self.postings[gram] for gram in grams]),
+                           weights=np.repeat(weights, [len(self.postings[gram]) for gram in grams]), minlength=len(self.names))
+        return np.flatnonzero(hits >= min_share * np.minimum(sum(weights), self.name_weights))
+
+    # Best (index, score) for one query; pruning kicks in for large name lists
+    # `ids` limits the search to those names (e.g. the cases left after filtering)
+    def best(self, query, score_cutoff=0, prune=None, workers=-1, ids=None):
+        indexes, scores = self.top(query, 1, score_cutoff, prune, workers, ids)
+        return (indexes[0], scores[0]) if indexes else (None, 0.0)
+
+    #(indexes, scores) of the n best names, best first; names below a `score_cutoff` are left out
+    @metrics.timed("fuzzy")
+    def top(self, query, n, score_cutoff=0, prune=None, workers=-1, ids=None):
+        query = normalize_name(query)
+        if prune is None:
+            prune = (len(self.names) if ids is None else len(ids)) >= PRUNE_MIN_NAMES
+        candidates = self.candidates(query) if prune and len(query) >= self.n else None
+        if candidates is not None:
+            ids = candidates if ids is None else np.intersect1d(candidates, ids)
+        if ids is None:
+            choices = self.names
+        else:
+            choices = [self.names[i] for i in ids]
+        if not choices:
+            return [], []
+        scores = process.cdist([query], choices, scorer=fuzz.partial_ratio, processor=None,
+                               dtype=np.float32, score_cutoff=score_cutoff, workers=workers)[0]
+        order = np.array([np.argmax(scores)]) if n == 1 else np.argsort(-scores, kind="stable")[:n]
+        if score_cutoff > 0:
+            order = order[scores[order] > 0]
+        return [int(ids[i]) if ids is not None else int(i) for i in order], [float(scores[i]) for i in order]
+
+    #full query x name score matrix (for batch lookups)
+    def scores(self, queries, score_cutoff=0, workers=-1):
+        return process.cdist([normalize_name(q) for q in queries], self.names, scorer=fuzz.partial_ratio,
+                             processor=None, dtype=np.float32, score_cutoff=score_cutoff, workers=workers)
+
+
+_fuzzy_indexes = {}
+
+
+#the FuzzyNameIndex for a corpus version, built once and reused until the version changes
+def fuzzy_index(names, version):
+    index = _fuzzy_indexes.get(version)
+    if index is None:
+        if len(_fuzzy_indexes) >= 4:
+            _fuzzy_indexes.pop(next(iter(_fuzzy_indexes)))
+        index = _fuzzy_indexes[version] = FuzzyNameIndex(names)
+    return index
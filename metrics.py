@@ -0,0 +1,301 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cProfile
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+# Stage timings, counters and an opt-in profiler for the search / summary paths.
+#   with metrics.span("encode"): ...        time a stage of the current request
+#   @metrics.timed("fuzzy")                 the same, for a whole function
+#   @metrics.instrument("case_assistant")   make every call (or generator run) one request
+#   metrics.inc("lawfirm_cache_hits_total", cache="llm")
+#   metrics.render()                        Prometheus text for a /metrics endpoint
+# Finished requests are logged as one JSON line each when LAWFIRM_METRICS_LOG is set.
+
+METRICS_LOG = os.getenv("LAWFIRM_METRICS_LOG", "")  # "-" for stderr, or a file path
+METRICS_PORT = int(os.getenv("LAWFIRM_METRICS_PORT", "0"))  # /metrics for the Gradio apps, 0 = off
+PROFILE_DIR = os.getenv("LAWFIRM_PROFILE", "")  # dump a .prof and a .folded trace per request
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+log = logging.getLogger("lawfirm.metrics")
+if METRICS_LOG:
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    log.addHandler(logging.StreamHandler() if METRICS_LOG == "-" else logging.FileHandler(METRICS_LOG, encoding="utf-8"))
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {
+    "lawfirm_request_seconds": "End-to-end time of an instrumented request",
+    "lawfirm_stage_seconds": "Time spent in one stage of a request",
+    "lawfirm_requests_total": "Instrumented requests, by outcome",
+}
+_local = threading.local()
+_ids = itertools.count(1)
+_profiler_lock = threading.Lock()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[0][i] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in pairs) + "}"
+
+
+#everything recorded so far, in the Prometheus text exposition format
+def render():
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (list(h[0]), h[1], h[2])) for key, h in _histograms.items())
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), (buckets, total, count) in histograms:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, n in zip(BUCKETS, buckets):
+            lines.append(f"{name}_bucket{_labels(labels, [('le', f'{bound:g}')])} {n}")
+        lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class Request:
+    """Timings of one search or summary request, possibly spread over several
+    threads (Gradio runs each step of a generator wherever it likes).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.id = next(_ids)
+        self.start = time.perf_counter()
+        self.stack = []  # open spans: [stage, start, time spent in child spans]
+        self.stages = {}
+        self.folded = {}
+        self.profiler = None
+
+    def span(self, stage):
+        return _Span(self, stage)
+
+    def finish(self, error=None, outcome=None):
+        seconds = time.perf_counter() - self.start
+        outcome = outcome or ("error" if error else "ok")
+        observe("lawfirm_request_seconds", seconds, request=self.name)
+        inc("lawfirm_requests_total", request=self.name, outcome=outcome)
+        if METRICS_LOG:
+            record = {"event": "request", "request": self.name, "id": self.id, "ms": round(seconds * 1000, 2),
+                      "outcome": outcome, "stages": {k: round(v * 1000, 2) for k, v in self.stages.items()}}
+            if error:
+                record["error"] = str(error)
+            log.info(json.dumps(record, ensure_ascii=False))
+        if PROFILE_DIR:
+            self._dump(seconds)
+
+    def _dump(self, seconds):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{self.name}-{int(time.time())}-{self.id}")
+        if self.profiler is not None:
+            self.profiler.dump_stats(base + ".prof")
+        # flamegraph.pl / speedscope "collapsed stack" format: self time per span path, in microseconds
+        self.folded[self.name] = self.folded.get(self.name, 0.0) + seconds - sum(
+            t for path, t in self.stages.items() if ";" not in path)
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for path, t in self.folded.items():
+                f.write(f"{path} {max(0, int(t * 1e6))}\n")
+
+
+class _Span:
+    def __init__(self, request, stage):
+        self.request = request
+        self.stage = stage
+
+    def __enter__(self):
+        self.request.stack.append([self.stage, time.perf_counter(), 0.0])
+        return self
+
+    def __exit__(self, *exc):
+        request = self.request
+        stage, start, children = request.stack.pop()
+        seconds = time.perf_counter() - start
+        path = ";".join([s[0] for s in request.stack] + [stage])
+        if request.stack:
+            request.stack[-1][2] += seconds
+        observe("lawfirm_stage_seconds", seconds, request=request.name, stage=stage)
+        request.stages[path] = request.stages.get(path, 0.0) + seconds
+        folded_path = request.name + ";" + path
+        request.folded[folded_path] = request.folded.get(folded_path, 0.0) + seconds - children
+        return False
+
+
+class _Timer:
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("lawfirm_stage_seconds", time.perf_counter() - self.start, request="", stage=self.stage)
+        return False
+
+
+def current():
+    return getattr(_local, "request", None)
+
+
+#time a stage; attached to the running request, if any
+def span(stage):
+    request = current()
+    return request.span(stage) if request is not None else _Timer(stage)
+
+
+#decorator form of span() for functions and generator functions
+def timed(stage):
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with span(stage):
+                    return (yield from fn(*args, **kwargs))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with span(stage):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _step(request, fn, *args):
+    previous = current()
+    _local.request = request
+    profiling = False
+    # cProfile can only run in one place at a time; concurrent requests go unprofiled
+    if request.profiler is not None and _profiler_lock.acquire(blocking=False):
+        try:
+            request.profiler.enable()
+            profiling = True
+        except ValueError:
+            _profiler_lock.release()
+    try:
+        return fn(*args)
+    finally:
+        if profiling:
+            request.profiler.disable()
+            _profiler_lock.release()
+        _local.request = previous
+
+
+#make each call of a function, or each full run of a generator function, one request;
+#called from inside another instrumented request it becomes a stage of that one instead
+def instrument(name):
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if current() is not None:
+                    with span(name):
+                        return (yield from fn(*args, **kwargs))
+                request = Request(name)
+                request.profiler = cProfile.Profile() if PROFILE_DIR else None
+                gen = fn(*args, **kwargs)
+                try:
+                    while True:
+                        try:
+                            value = _step(request, next, gen)
+                        except StopIteration as stop:
+                            request.finish()
+                            return stop.value
+                        yield value
+                except GeneratorExit:
+                    # the client went away mid-stream
+                    gen.close()
+                    request.finish(outcome="cancelled")
+                    raise
+                except Exception as e:
+                    request.finish(e)
+                    raise
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if current() is not None:
+                    with span(name):
+                        return fn(*args, **kwargs)
+                request = Request(name)
+                request.profiler = cProfile.Profile() if PROFILE_DIR else None
+                try:
+                    result = _step(request, functools.partial(fn, *args, **kwargs))
+                except Exception as e:
+                    request.finish(e)
+                    raise
+                request.finish()
+                return result
+        return wrapper
+    return decorate
+
+
+#serve GET /metrics from a background thread (for the Gradio apps, which have no HTTP hook of their own)
+def serve(port=METRICS_PORT, host="127.0.0.1"):
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            data = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,109 @@
+import metrics
+import os
+import re
+
+# Query mode asks Gemini once: the retrieved cases are packed into a single prompt that fits
+# LAWFIRM_PROMPT_TOKENS and the reply comes back in sections, one simplified summary per case
+# plus the answer. Sections are parsed while the reply streams in.
+#   ### CASE 1
+#   <simplified summary>
+#   ### CASE 2
+#   ...
+#   ### ANSWER
+#   <answer to the query>
+
+PROMPT_TOKENS = int(os.getenv("LAWFIRM_PROMPT_TOKENS", "3000"))
+# below this many tokens of case text per case, the lowest-ranked cases are left out instead
+CASE_MIN_TOKENS = int(os.getenv("LAWFIRM_CASE_MIN_TOKENS", "150"))
+SUMMARY_WORDS = 80
+
+# roughly one sub-word token per 4 letters or per punctuation mark, close to what BPE tokenizers give on English
+_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+_HEADING = re.compile(r"^#+\s*(?:CASE\s+(\d+)|ANSWER)\s*:?\s*$", re.IGNORECASE | re.MULTILINE)
+
+INSTRUCTIONS = (
+    "You are a legal expert. Below are {count} legal cases retrieved for a query, each under a "
+    "'=== CASE <number> ===' line. Reply in exactly this format, with nothing before the first heading:\n\n"
+    "{layout}\n"
+    "Each summary explains its case in simple terms in at most {words} words. "
+    "The answer addresses the query using only these cases.\n\n"
+    "Query: {query}\n\n"
+)
+
+
+def count_tokens(text):
+    return len(_TOKEN.findall(text))
+
+
+#the start of `text` within `budget` tokens, cut at a sentence (else word) boundary
+def trim_to_tokens(text, budget):
+    tokens = list(_TOKEN.finditer(text))
+    if len(tokens) <= budget:
+        return text
+    if budget < 2:
+        return ""
+    head = text[:tokens[budget - 2].end()]  # one token is left for the ellipsis
+    sentence = max(head.rfind(". "), head.rfind(".\n"))
+    if sentence > len(head) // 2:
+        head = head[:sentence + 1]
+    elif " " in head:
+        head = head[:head.rfind(" ")]
+    return head.rstrip() + " …"
+
+
+#split `total` tokens over texts that need `needs` tokens; short texts give their unused share to the rest
+def allocate(needs, total):
+    shares = [0] * len(needs)
+    left = max(0, total)
+    for position, i in enumerate(sorted(range(len(needs)), key=lambda i: needs[i])):
+        shares[i] = min(needs[i], left // (len(needs) - position))
+        left -= shares[i]
+    return shares
+
+
+def _header(query, count):
+    layout = "".join(f"### CASE {i + 1}\n<summary>\n" for i in range(count)) + "### ANSWER\n<answer>\n"
+    return INSTRUCTIONS.format(count=count, layout=layout, words=SUMMARY_WORDS, query=query)
+
+
+def _case_heading(i, case):
+    return f"=== CASE {i + 1} ===\n{case['name']}\nCharges: {case['charges']}\n"
+
+
+#(prompt, number of cases packed) for `cases`, best first, each a dict with "name", "charges"
+#and "texts" (passages, most relevant first). Cases keep at least `min_case_tokens` of text each,
+#or the lowest-ranked ones are dropped; passages are trimmed from the end to fit.
+def pack_cases(query, cases, budget=PROMPT_TOKENS, min_case_tokens=CASE_MIN_TOKENS):
+    query = trim_to_tokens(query, budget // 4)
+    count = len(cases)
+    while True:
+        fixed = count_tokens(_header(query, count)) + sum(count_tokens(_case_heading(i, case)) for i, case in enumerate(cases[:count]))
+        room = budget - fixed
+        if count <= 1 or room >= count * min_case_tokens:
+            break
+        count -= 1
+
+    bodies = ["\n\n".join(case["texts"]) for case in cases[:count]]
+    shares = allocate([count_tokens(body) for body in bodies], room)
+    blocks = [_case_heading(i, case) + trim_to_tokens(body, share) + "\n\n"
+              for i, (case, body, share) in enumerate(zip(cases, bodies, shares))]
+    prompt = _header(query, count) + "".join(blocks)
+    metrics.inc("lawfirm_prompt_tokens_total", count_tokens(prompt))
+    return prompt, count
+
+
+#{case position (0-based): summary, "answer": answer} from a (possibly still streaming) reply;
+#a reply without any headings is taken as the answer
+def parse_reply(text):
+    last = text.rsplit("\n", 1)[-1]
+    if last.startswith("#") and not _HEADING.match(last):
+        text = text[:len(text) - len(last)]  # a heading that is still streaming in
+    headings = list(_HEADING.finditer(text))
+    if not headings:
+        return {"answer": text.strip()} if text.strip() else {}
+    sections = {}
+    for heading, following in zip(headings, headings[1:] + [None]):
+        body = text[heading.end():following.start() if following else len(text)].strip()
+        key = int(heading.group(1)) - 1 if heading.group(1) else "answer"
+        sections[key] = body
+    return sections
@@ -0,0 +1,106 @@
+import matcher
+import metrics
+import numpy as np
+import os
+
+# Second search stage: the cheap first stage (bi-encoder + fuzzy for names, BM25 + dense
+# for queries) proposes up to RERANK_CANDIDATES cases, a local cross-encoder scores each
+# (query, case) pair in one batch, and the result carries a confidence in [0, 1].
+# Searches whose best candidate is below MIN_CONFIDENCE (MIN_NAME_CONFIDENCE for client
+# names) stop before any Gemini call.
+# LAWFIRM_RERANK_MODEL=off keeps the first-stage order and the old thresholds.
+
+RERANK_MODEL = os.getenv("LAWFIRM_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("LAWFIRM_RERANK_CANDIDATES", "20"))
+RERANK_BATCH = int(os.getenv("LAWFIRM_RERANK_BATCH", "32"))
+# confidences are sigmoid(logit): 0.1 is a logit of about -2.2, 0.02 about -3.9
+MIN_CONFIDENCE = float(os.getenv("LAWFIRM_RERANK_MIN_CONFIDENCE", "0.1"))
+# a bare name carries little for a passage model to go on, and its candidates already
+# passed the semantic / fuzzy thresholds, so names only need to clear a lower bar
+MIN_NAME_CONFIDENCE = float(os.getenv("LAWFIRM_RERANK_MIN_NAME_CONFIDENCE", "0.02"))
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name=RERANK_MODEL, batch_size=RERANK_BATCH, max_length=512):
+        from sentence_transformers import CrossEncoder
+        import inspect
+        import torch
+
+        # raw logits out of the model (ms-marco models may ship without a sigmoid); confidences() applies it.
+        # The keyword was renamed in sentence-transformers 4
+        option = "activation_fn" if "activation_fn" in inspect.signature(CrossEncoder.__init__).parameters else "default_activation_function"
+        self.model = CrossEncoder(model_name, device="cpu", max_length=max_length, **{option: torch.nn.Identity()})
+        self.batch_size = batch_size
+        self.model_name = model_name
+
+    #relevance of each text to the query in [0, 1]: the sigmoid of the cross-encoder logit
+    @metrics.timed("rerank")
+    def confidences(self, query, texts):
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        logits = self.model.predict([(query, text) for text in texts], batch_size=self.batch_size,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        logits = np.clip(np.asarray(logits, dtype=np.float64).reshape(len(texts)), -50.0, 50.0)  # exp() stays finite
+        return (1.0 / (1.0 + np.exp(-logits))).astype(np.float32)
+
+
+#the reranker, or None when LAWFIRM_RERANK_MODEL is "off"
+def make_reranker(model_name=RERANK_MODEL):
+    if not model_name or model_name == "off":
+        return None
+    return CrossEncoderReranker(model_name)
+
+
+#first line of the case title, e.g. 'Cover Page for the case "Roy v. State of X".'
+def case_title(case):
+    client = case.get("client", "")
+    return client.splitlines()[0] if client else ""
+
+
+#text a query is scored against: the charges and the retrieved chunks of the case
+def case_passage(case, chunks):
+    return f"{case_title(case)}\nCharges: {', '.join(case.get('charges', []))}\n" + "\n".join(chunks)
+
+
+#cases that pass the old name thresholds: semantic top-n above 0.6, then fuzzy top-n above 80.
+#`semantic_scores` covers `allowed` (or every case); with no reranker the first entry is the old winner
+def name_candidates(semantic_scores, fuzzy_names, name, allowed=None, n=RERANK_CANDIDATES):
+    semantic_scores = np.asarray(semantic_scores)
+    order = np.argsort(-semantic_scores, kind="stable")[:n]
+    candidates = {}
+    for position in order[semantic_scores[order] > matcher.SEMANTIC_THRESHOLD]:
+        index = int(allowed[position]) if allowed is not None else int(position)
+        candidates[index] = {"index": index, "method": "semantic", "semantic_score": float(semantic_scores[position]),
+                             "fuzzy_score": 0.0}
+    ids, scores = fuzzy_names.top(name, n, score_cutoff=matcher.FUZZY_THRESHOLD, ids=allowed)
+    for index, score in zip(ids, scores):
+        if score <= matcher.FUZZY_THRESHOLD:
+            continue
+        if index in candidates:
+            candidates[index]["fuzzy_score"] = score
+        else:
+            position = index if allowed is None else int(np.searchsorted(allowed, index))
+            candidates[index] = {"index": index, "method": "fuzzy", "semantic_score": float(semantic_scores[position]),
+                                 "fuzzy_score": score}
+    return list(candidates.values())
+
+
+#[(candidate, confidence)] best first; with no reranker the first-stage order is kept and confidence is None
+def rerank(reranker, query, candidates, texts):
+    if reranker is None or not candidates:
+        return [(candidate, None) for candidate in candidates]
+    confidences = reranker.confidences(query, texts)
+    order = np.argsort(-confidences, kind="stable")
+    return [(candidates[i], float(confidences[i])) for i in order]
+
+
+#(candidate, confidence) of the best case for a client name, or (None, None) when no case passes stage 1
+def match_name(reranker, semantic_scores, fuzzy_names, name, cases, allowed=None):
+    candidates = name_candidates(semantic_scores, fuzzy_names, name, allowed)
+    if not candidates:
+        return None, None
+    return rerank(reranker, name, candidates, [case_title(cases[c["index"]]) for c in candidates])[0]
+
+
+def is_confident(confidence, min_confidence=MIN_CONFIDENCE):
+    return confidence is None or confidence >= min_confidence
@@ -0,0 +1,242 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import facets
+import json
+import lexical
+import llmcalls
+import metrics
+import os
+import queue
+import rerank
+import threading
+import time
+import watcher
+
+# Headless JSON API around the same matching / summarization code as the Gradio apps.
+#   python server.py --cases ./cases --port 8000
+#   GET  /healthz          process is up
+#   GET  /readyz           200 once the model and indexes are warm, 503 before
+#   GET  /metrics          Prometheus text: stage latencies, cache hits, Gemini errors
+#   POST /search/name      {"name": "Meena"}
+#   POST /search/query     {"query": "dowry harassment", "top_k": 3}
+#   both searches take "filters": {"section": "IPC 498A", "party": "state", "year": "2015-2020"}
+#   POST /summary          {"source": "Case1_Roy_v_State.docx", "kind": "simplified" | "suggestions"}
+
+BATCH_WINDOW = float(os.getenv("LAWFIRM_BATCH_WINDOW", "0.005"))
+BATCH_MAX = int(os.getenv("LAWFIRM_BATCH_MAX", "64"))
+
+SUMMARY_PROMPTS = {
+    "simplified": llmcalls.SIMPLIFY_PROMPT,
+    "suggestions": "You are a legal expert. Based on this case, give next legal steps, key issues, and suggestions.\n\n{summary}",
+}
+
+
+class EncodeBatcher:
+    """Collects encode() calls that arrive within a few milliseconds of each
+    other and runs them through the model as one batch.
+    """
+
+    def __init__(self, embedder, window=BATCH_WINDOW, max_batch=BATCH_MAX):
+        self.embedder = embedder
+        self.model_name = getattr(embedder, "model_name", "all-MiniLM-L6-v2")
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        threading.Thread(target=self._run, name="encode-batcher", daemon=True).start()
+
+    def encode(self, texts, **kwargs):
+        texts = list(texts)
+        # index builds are already batched; only small query encodes are worth merging
+        if len(texts) >= self.max_batch:
+            return self.embedder.encode(texts, **kwargs)
+        done = threading.Event()
+        slot = {"texts": texts, "done": done}
+        self.requests.put(slot)
+        done.wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["vectors"]
+
+    def _run(self):
+        while True:
+            pending = [self.requests.get()]
+            size = len(pending[0]["texts"])
+            deadline = time.monotonic() + self.window
+            while size < self.max_batch:
+                try:
+                    slot = self.requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                pending.append(slot)
+                size += len(slot["texts"])
+            try:
+                vectors = self.embedder.encode([text for slot in pending for text in slot["texts"]])
+                start = 0
+                for slot in pending:
+                    slot["vectors"] = vectors[start:start + len(slot["texts"])]
+                    start += len(slot["texts"])
+            except Exception as e:
+                for slot in pending:
+                    slot["error"] = e
+            for slot in pending:
+                slot["done"].set()
+
+
+class CaseService:
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.ready = threading.Event()
+        self.error = None
+        self.embedder = None
+        self.gemini = None
+        self.reranker = None
+
+    # load the model, parse the corpus and build every index before reporting ready
+    def warm_up(self):
+        try:
+            import embedders
+
+            self.embedder = EncodeBatcher(embedders.make_embedder())
+            self.reranker = rerank.make_reranker()
+            self.gemini = llmcalls.make_gemini(require_key=True)
+            # the watcher builds the indexes now and rebuilds them in the background on changes
+            self.watcher = watcher.CaseWatcher(self.folder_path, self.embedder).start()
+            self.embedder.encode(["warm-up"])
+            self.ready.set()
+        except Exception as e:
+            self.error = e
+            raise
+
+    def snapshot(self):
+        snapshot = self.watcher.current()
+        if snapshot is None:
+            raise LookupError(f"No cases loaded from {self.folder_path}")
+        return snapshot
+
+    @metrics.instrument("name_search")
+    def name_search(self, name, filters=None):
+        snapshot = self.snapshot()
+        cases = snapshot.cases
+        allowed = snapshot.facets.filter(**filters) if filters else None
+        if not name or not cases or (allowed is not None and not len(allowed)):
+            return {"match": None}
+        semantic_scores = snapshot.name_index.scores(name, rows=allowed)
+        best, confidence = rerank.match_name(self.reranker, semantic_scores, snapshot.fuzzy_names, name, cases, allowed)
+        if best is None:
+            return {"match": None, "semantic_score": float(semantic_scores.max()), "fuzzy_score": 0.0}
+        scores = {"method": best["method"], "semantic_score": best["semantic_score"], "fuzzy_score": best["fuzzy_score"],
+                  "confidence": confidence}
+        # below the confidence bar the closest case is reported, but not as a match
+        if not rerank.is_confident(confidence, rerank.MIN_NAME_CONFIDENCE):
+            return {"match": None, "closest": cases[best["index"]], **scores}
+        return {"match": cases[best["index"]], **scores}
+
+    @metrics.instrument("query_search")
+    def query_search(self, query, top_k=3, filters=None):
+        snapshot = self.snapshot()
+        cases = snapshot.cases
+        if not query or not cases:
+            return {"results": []}
+        allowed = snapshot.facets.filter(**filters) if filters else None
+        depth = rerank.RERANK_CANDIDATES if self.reranker is not None else top_k
+        matches = lexical.hybrid_search(query, snapshot.chunk_index, snapshot.lexical_index, max(depth, top_k), allowed=allowed)
+        ranked = rerank.rerank(self.reranker, query, matches, [rerank.case_passage(cases[idx], chunks) for idx, _, chunks in matches])
+        results = []
+        for (idx, score, chunks), confidence in ranked:
+            if not rerank.is_confident(confidence):
+                continue
+            case = cases[idx]
+            results.append({"source": case["source"], "client": case.get("client"), "charges": case.get("charges", []),
+                            "score": score, "confidence": confidence, "chunks": chunks})
+        return {"results": results[:top_k]}
+
+    @metrics.instrument("summary")
+    def summary(self, source, kind="simplified"):
+        if kind not in SUMMARY_PROMPTS:
+            raise ValueError(f"kind must be one of {sorted(SUMMARY_PROMPTS)}")
+        if self.gemini is None:
+            raise RuntimeError("Gemini is not configured")
+        case = next((case for case in self.snapshot().cases if case["source"] == source), None)
+        if case is None:
+            raise LookupError(f"No case with source {source!r}")
+        prompt = SUMMARY_PROMPTS[kind].format(summary=case["summaries"])
+        return {"source": source, "kind": kind, "text": llmcalls.generate(self.gemini, prompt)}
+
+
+def filters_of(body):
+    filters = body.get("filters") or {}
+    return facets.parse_filters(filters.get("section", ""), filters.get("party", ""), str(filters.get("year", "")))
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                data = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            elif self.path == "/healthz":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/readyz":
+                if service.ready.is_set():
+                    self._send(200, {"status": "ready"})
+                else:
+                    self._send(503, {"status": "error" if service.error else "warming up", "error": str(service.error or "")})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            routes = {
+                "/search/name": lambda body: service.name_search(body.get("name", "").strip(), filters_of(body)),
+                "/search/query": lambda body: service.query_search(body.get("query", "").strip(), int(body.get("top_k", 3)),
+                                                                   filters_of(body)),
+                "/summary": lambda body: service.summary(body.get("source", ""), body.get("kind", "simplified")),
+            }
+            if self.path not in routes:
+                return self._send(404, {"error": "not found"})
+            if not service.ready.is_set():
+                return self._send(503, {"error": "service is warming up"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                self._send(200, routes[self.path](body))
+            except (ValueError, LookupError) as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve case search and summaries over HTTP.")
+    parser.add_argument("--cases", default="./cases", help="folder with Case*.docx files")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--embed-backend", choices=["torch", "onnx", "onnx-int8"], help="overrides LAWFIRM_EMBED_BACKEND")
+    args = parser.parse_args()
+    if args.embed_backend:
+        import embedders
+
+        embedders.EMBED_BACKEND = args.embed_backend
+
+    service = CaseService(args.cases)
+    threading.Thread(target=service.warm_up, name="warm-up", daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Listening on http://{args.host}:{args.port} (ready once /readyz returns 200)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
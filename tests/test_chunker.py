@@ -0,0 +1,69 @@
+from chunker import ChunkIndex
+import chunker
+import numpy as np
+import pytest
+
+VOCAB = ["fraud", "bank", "murder", "land", "dowry", "lease"]
+
+
+class BagOfWordsEmbedder:
+    model_name = "bag-of-words-test"
+
+    def encode(self, texts, **kwargs):
+        return np.array([[text.split().count(word) + 0.01 for word in VOCAB] for text in texts], dtype=np.float32)
+
+
+def paragraphs(count, words):
+    return "\n".join(" ".join(words[(i + j) % len(words)] for j in range(150)) for i in range(count))
+
+
+@pytest.fixture
+def index(tmp_path):
+    cases = [
+        {"client": "Long v. Bank", "summaries": paragraphs(60, ["fraud", "bank", "fraud", "lease"])},
+        {"client": "Roy v. State", "summaries": paragraphs(1, ["murder", "fraud", "land"])},
+        {"client": "Neha v. Suresh", "summaries": paragraphs(2, ["dowry", "fraud", "land", "murder"])},
+        {"client": "Kumar v. MetroCorp", "summaries": paragraphs(1, ["lease", "land", "fraud", "bank"])},
+    ]
+    chunk_index = ChunkIndex("test_chunks", BagOfWordsEmbedder(), cache_dir=str(tmp_path))
+    chunk_index.update(cases, "v1")
+    return chunk_index
+
+
+#case -> max or sum of its chunk scores, from every chunk
+def brute_force(index, query, aggregate):
+    scores = index.index.scores(query)
+    totals = {}
+    for row, case in enumerate(index.chunk_case.tolist()):
+        if aggregate == "sum":
+            totals[case] = totals.get(case, 0.0) + float(scores[row])
+        else:
+            totals[case] = max(totals.get(case, -1.0), float(scores[row]))
+    return totals
+
+
+@pytest.mark.parametrize("aggregate", ["max", "sum"])
+def test_long_case_does_not_crowd_out_the_others(index, aggregate):
+    assert np.bincount(index.chunk_case)[0] > 3 * chunker.CANDIDATES_PER_CASE
+    results = index.search("fraud bank", top_k=3, aggregate=aggregate)
+    expected = brute_force(index, "fraud bank", aggregate)
+    assert len(results) == 3
+    assert [case for case, _, _ in results] == sorted(expected, key=expected.get, reverse=True)[:3]
+    for case, score, chunks in results:
+        assert score == pytest.approx(expected[case], rel=1e-5)
+        assert 1 <= len(chunks) <= 2
+
+
+@pytest.mark.parametrize("aggregate", ["max", "sum"])
+def test_search_within_cases(index, aggregate):
+    results = index.search("fraud bank", top_k=3, aggregate=aggregate, cases=np.array([1, 2]))
+    expected = brute_force(index, "fraud bank", aggregate)
+    assert sorted(case for case, _, _ in results) == [1, 2]
+    assert all(score == pytest.approx(expected[case], rel=1e-5) for case, score, _ in results)
+    assert index.search("fraud", cases=np.array([], dtype=np.int64)) == []
+
+
+def test_best_chunks_come_first(index):
+    (case, score, chunks), = index.search("murder", top_k=1, per_case=1, cases=np.array([2]))
+    assert case == 2
+    assert float(index.index.encode([f"Neha v. Suresh: {chunks[0]}"])[0] @ index.index.encode(["murder"])[0]) == pytest.approx(score, rel=1e-5)
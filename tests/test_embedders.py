@@ -0,0 +1,49 @@
+import casestore
+import chunker
+import embedders
+import glob
+import numpy as np
+import os
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("transformers")
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES = ["dowry harassment", "medical negligence at a hospital", "wrongful termination and unpaid gratuity",
+           "bank fraud and cheating", "defamation by a news channel", "murder with common intention"]
+
+
+#the bundled cases, chunked the way ChunkIndex does
+@pytest.fixture(scope="module")
+def texts():
+    cases = [casestore.parse_case_file(path) for path in sorted(glob.glob(os.path.join(HERE, "Case*.docx")))]
+    return [f"{case.get('client', '')}: {chunk}" for case in cases if case for chunk in chunker.split_chunks(case["summaries"])]
+
+
+@pytest.fixture(scope="module")
+def torch_vectors(texts):
+    try:
+        embedder = embedders.make_embedder("torch")
+    except OSError as e:  # no cached model and no network
+        pytest.skip(f"embedding model unavailable: {e}")
+    return unit(embedder.encode(texts)), unit(embedder.encode(QUERIES))
+
+
+def unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+@pytest.mark.parametrize("backend, min_cosine", [("onnx", 0.999), ("onnx-int8", 0.95)])
+def test_onnx_backend_matches_torch(backend, min_cosine, texts, torch_vectors):
+    base_corpus, base_queries = torch_vectors
+    embedder = embedders.make_embedder(backend)
+    corpus = unit(embedder.encode(texts))
+    queries = unit(embedder.encode(QUERIES))
+    assert float(np.mean(np.sum(base_corpus * corpus, axis=1))) >= min_cosine
+    k = 5
+    base_top = np.argsort(-(base_queries @ base_corpus.T), axis=1)[:, :k]
+    top = np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+    assert np.mean([len(set(a) & set(b)) / k for a, b in zip(base_top, top)]) >= 0.8
@@ -0,0 +1,76 @@
+import facets
+import lexical
+import pytest
+
+
+@pytest.mark.parametrize("charge, keys", [
+    ("IPC §498A", ["IPC:498A"]),
+    ("498A IPC", ["IPC:498A"]),
+    ("498-A", ["498A"]),
+    ("IPC 498-A", ["IPC:498A"]),
+    ("s. 498-a IPC", ["IPC:498A"]),
+    ("Section 13 HMA", ["HMA:13"]),
+    ("IPC 302 and 34", ["IPC:302", "IPC:34"]),
+    ("IPC 420 r/w 120B", ["IPC:420", "IPC:120B"]),
+    ("Article 19(1)(a)", ["CONST:19"]),
+    ("Sections 66A of IT Act", ["IT:66A"]),
+    ("IPC 302; 2019 case", ["IPC:302"]),
+    ("garbage", []),
+])
+def test_normalize_charges(charge, keys):
+    assert facets.normalize_charges([charge]) == keys
+
+
+def test_act_carries_over_to_following_charges():
+    assert facets.normalize_charges(["IPC §498A", "§406"]) == ["IPC:498A", "IPC:406"]
+
+
+@pytest.mark.parametrize("client, expected", [
+    ('Cover Page for the case "Roy v. State of Maharashtra".', ("Roy", "State of Maharashtra")),
+    ("Neha v. Suresh (2023)", ("Neha", "Suresh")),
+    ("Radha v. Reliance Bank Ltd.\nCase Type: Civil", ("Radha", "Reliance Bank Ltd.")),
+    ("Just a title", (None, None)),
+    ("", (None, None)),
+])
+def test_parties(client, expected):
+    assert facets.parties(client) == expected
+
+
+@pytest.mark.parametrize("name, kind", [
+    ("State", "state"), ("State of Kerala", "state"), ("Union of India", "state"),
+    ("Reliance Bank", "company"), ("IndiaTech Pvt Ltd", "company"),
+    ("State Hospital", "public_body"), ("Election Commission", "public_body"),
+    ("Maya", "individual"), (None, None),
+])
+def test_party_type(name, kind):
+    assert facets.party_type(name) == kind
+
+
+@pytest.fixture
+def index():
+    return facets.FacetIndex([
+        {"client": "Roy v. State (2019)", "charges": ["IPC 302", "IPC 34"]},
+        {"client": "Neha v. Suresh (2021)", "charges": ["IPC 498-A"]},
+        {"client": "Radha v. Reliance Bank (2021)", "charges": ["Consumer Protection Act 35"]},
+    ])
+
+
+def test_filter_by_facets(index):
+    assert index.filter() is None
+    assert index.filter(section="498A IPC").tolist() == [1]
+    assert index.filter(section="IPC 302").tolist() == [0]
+    assert index.filter(section="498").tolist() == []
+    assert index.filter(party="company").tolist() == [2]
+    assert index.filter(year=(2020, 2022)).tolist() == [1, 2]
+    assert index.filter(section="302", year=(2021, 2021)).tolist() == []
+
+
+@pytest.mark.parametrize("section", ["garbage", "IPC"])
+def test_unrecognized_section_matches_nothing(index, section):
+    assert index.filter(section=section).tolist() == []
+
+
+def test_pure_section_queries():
+    assert lexical.pure_section_query("IPC 498-A") == ["IPC:498A"]
+    assert lexical.pure_section_query("section 302 and 34") == ["302", "34"]
+    assert lexical.pure_section_query("dowry harassment under 498A") is None
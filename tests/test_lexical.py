@@ -0,0 +1,50 @@
+import lexical
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def index():
+    rng = np.random.default_rng(0)
+    vocab = [f"w{i}" for i in range(300)]
+    return lexical.BM25Index([list(rng.choice(vocab, size=rng.integers(5, 60))) for _ in range(3000)])
+
+
+#BM25 of every allowed document, scored one by one
+def brute_force(index, tokens, allowed):
+    scores = {}
+    for term in set(tokens):
+        if term not in index.postings:
+            continue
+        ids, tfs, idf = index.postings[term]
+        for doc_id, tf in zip(ids.tolist(), tfs.tolist()):
+            if doc_id in allowed:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (index.k1 + 1) / (tf + index.norms[doc_id])
+    return scores
+
+
+@pytest.mark.parametrize("size", [1, 10, 100, 2500])
+def test_allowed_search_matches_brute_force(index, size):
+    rng = np.random.default_rng(size)
+    for _ in range(20):
+        tokens = [f"w{i}" for i in rng.choice(300, size=3)] + ["missing"]
+        allowed = np.sort(rng.choice(3000, size=size, replace=False))
+        expected = brute_force(index, tokens, set(allowed.tolist()))
+        ids, scores = index.search(tokens, 10, allowed)
+        assert set(ids) <= set(allowed.tolist())
+        assert np.allclose(scores, sorted(expected.values(), reverse=True)[:10], rtol=1e-5)
+        assert all(np.isclose(expected[i], s, rtol=1e-5) for i, s in zip(ids, scores))
+
+
+def test_empty_filter_and_unknown_terms(index):
+    assert index.search(["w1"], 5, np.array([], dtype=np.int64)) == ([], [])
+    assert index.search(["missing"], 5) == ([], [])
+
+
+def test_intersect_sorted():
+    a = np.array([1, 4, 7, 9, 12])
+    b = np.array([0, 4, 5, 9, 13, 20, 30])
+    in_a, in_b = lexical.intersect_sorted(a, b)
+    assert a[in_a].tolist() == b[in_b].tolist() == [4, 9]
+    in_b, in_a = lexical.intersect_sorted(b, a)
+    assert a[in_a].tolist() == b[in_b].tolist() == [4, 9]
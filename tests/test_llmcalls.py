@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+from fakegemini import FakeGemini, FakeResponse
+import llmcache
+import llmcalls
+import metrics
+import pytest
+
+FALLBACK = "unavailable ({error})"
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    # every test starts cold and nothing is written to the on-disk reply cache
+    monkeypatch.setattr(llmcache, "_cache", llmcache.ResponseCache(db_path="off"))
+    monkeypatch.setattr(llmcalls, "GEMINI_RETRY_DELAY", 0.0)
+
+
+def fallbacks(prompts):
+    return {key: FALLBACK for key in prompts}
+
+
+def test_run_prompts_returns_every_reply():
+    prompts = {"a": "first prompt", "b": "second prompt"}
+    results = llmcalls.run_prompts(FakeGemini(latency=0.01), prompts, fallbacks(prompts), timeout=5)
+    assert results["a"].startswith("[fake reply to 2 words] first prompt")
+    assert results["b"].startswith("[fake reply to 2 words] second prompt")
+
+
+def test_run_prompts_failure_gets_fallback():
+    prompts = {"a": "failing prompt"}
+    results = llmcalls.run_prompts(FakeGemini(latency=0.0, fail_rate=1.0), prompts, fallbacks(prompts), timeout=5)
+    assert results == {"a": "unavailable (fake Gemini failure)"}
+
+
+def test_run_prompts_keeps_what_finished_before_the_timeout():
+    # one worker: the first call finishes in time, the queued ones do not
+    prompts = {i: f"prompt number {i}" for i in range(3)}
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        results = llmcalls.run_prompts(FakeGemini(latency=0.2), prompts, fallbacks(prompts), timeout=0.3, pool=pool)
+    assert results[0].startswith("[fake reply")
+    assert results[1] == results[2] == "unavailable (timed out after 0.3s)"
+
+
+def test_run_prompts_second_call_is_cached():
+    model = FakeGemini(latency=0.0)
+    prompts = {"a": "cached prompt"}
+    first = llmcalls.run_prompts(model, prompts, fallbacks(prompts), timeout=5)
+    second = llmcalls.run_prompts(model, prompts, fallbacks(prompts), timeout=5)
+    assert first == second and model.calls == 1
+
+
+def test_stream_prompts_grows_to_the_full_reply():
+    prompts = {"a": "streamed prompt with a few words"}
+    updates = list(llmcalls.stream_prompts(FakeGemini(latency=0.05), prompts, fallbacks(prompts), timeout=5))
+    lengths = [len(update["a"]) for update in updates]
+    assert len(updates) > 1 and lengths == sorted(lengths)
+    assert updates[-1]["a"].strip() == "[fake reply to 6 words] streamed prompt with a few words"
+
+
+def test_stream_prompts_failure_gets_fallback():
+    prompts = {"a": "failing streamed prompt"}
+    updates = list(llmcalls.stream_prompts(FakeGemini(latency=0.0, fail_rate=1.0), prompts, fallbacks(prompts), timeout=5))
+    assert updates[-1] == {"a": "unavailable (fake Gemini failure)"}
+
+
+def test_stream_prompts_keeps_partial_text_on_timeout():
+    # five chunks over 2s: a couple arrive before the 0.9s deadline
+    prompts = {"slow": "slow streamed prompt " * 10}
+    updates = list(llmcalls.stream_prompts(FakeGemini(latency=2.0), prompts, fallbacks(prompts), timeout=0.9))
+    final = updates[-1]["slow"]
+    assert final.startswith("[fake reply to 30 words]")
+    assert not final.startswith("unavailable")
+    assert len(final.split()) < 34
+
+
+def test_stream_prompts_timeout_without_text_gets_fallback():
+    prompts = {"slow": "very slow prompt"}
+    updates = list(llmcalls.stream_prompts(FakeGemini(latency=5.0), prompts, fallbacks(prompts), timeout=0.2))
+    assert updates[-1] == {"slow": "unavailable (timed out after 0.2s)"}
+
+
+class EmptyGemini(FakeGemini):
+    """Replies with no text, like a reply blocked by a safety filter."""
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        if stream:
+            return iter([BlockedChunk()])
+        return FakeResponse("")
+
+
+class BlockedChunk:
+    @property
+    def text(self):
+        raise ValueError("no text in this chunk")
+
+
+def test_empty_replies_are_not_cached():
+    model = EmptyGemini(latency=0.0)
+    prompts = {"a": "blocked prompt"}
+    assert llmcalls.run_prompts(model, prompts, fallbacks(prompts), timeout=5) == {"a": ""}
+    list(llmcalls.stream_prompts(model, prompts, fallbacks(prompts), timeout=5))
+    llmcalls.run_prompts(model, prompts, fallbacks(prompts), timeout=5)
+    assert model.calls == 3
+    assert llmcache.get_cache().get(llmcache.make_key(model, prompts["a"])) is None
+
+
+class FlakyGemini(FakeGemini):
+    """Fails its first `failures` calls, then answers."""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.failures = failures
+
+    def _maybe_fail(self):
+        if self.calls <= self.failures:
+            raise RuntimeError("fake Gemini failure")
+
+
+def retries():
+    return metrics._counters.get(("lawfirm_gemini_retries_total", ()), 0)
+
+
+def test_failed_calls_are_retried():
+    before = retries()
+    prompts = {"a": "flaky prompt"}
+    results = llmcalls.run_prompts(FlakyGemini(failures=2), prompts, fallbacks(prompts), timeout=5)
+    assert results["a"].startswith("[fake reply")
+    updates = list(llmcalls.stream_prompts(FlakyGemini(failures=1), {"b": "flaky stream"}, fallbacks(["b"]), timeout=5))
+    assert updates[-1]["b"].startswith("[fake reply")
+    assert retries() - before == 3
+
+
+def test_retries_are_bounded():
+    model = FlakyGemini(failures=10)
+    prompts = {"a": "flaky prompt"}
+    results = llmcalls.run_prompts(model, prompts, fallbacks(prompts), timeout=5)
+    assert results == {"a": "unavailable (fake Gemini failure)"}
+    assert model.calls == llmcalls.GEMINI_RETRIES + 1
@@ -0,0 +1,47 @@
+import matcher
+import numpy as np
+import random
+
+
+#case titles built from a small vocabulary, so common n-grams ("kav", " v. ") are in thousands of names
+def case_names(count, seed=0):
+    rng = random.Random(seed)
+    syllables = ["ka", "vy", "pa", "tel", "ra", "hul", "me", "na", "jiv", "a", "li", "ma", "ya", "sha", "rif",
+                 "ro", "ku", "mar", "ki", "ran", "pri", "jun", "vik", "ram", "su", "ni", "ta", "dee", "far", "han"]
+    words = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).title() for _ in range(400)]
+    others = ["State", "Union of India", "Reliance Bank", "MetroCorp", "RTO"]
+    return [f"{rng.choice(words[:100])} {rng.choice(words)} v. {rng.choice(others)}" for _ in range(count)]
+
+
+def typo(text, rng):
+    i = rng.randrange(1, len(text) - 1)
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return rng.choice([text[:i] + letter + text[i + 1:], text[:i] + text[i + 1:], text[:i] + letter + text[i:]])
+
+
+def test_pruned_lookup_finds_what_the_full_scan_finds():
+    names = case_names(8000)
+    index = matcher.FuzzyNameIndex(names)
+    rng = random.Random(1)
+    queries = ["Kavy Patel"] + [typo(names[i].split(" v.")[0], rng) for i in rng.sample(range(len(names)), 200)]
+    for query in queries:
+        full = index.best(query, matcher.FUZZY_THRESHOLD, prune=False)
+        pruned = index.best(query, matcher.FUZZY_THRESHOLD, prune=True)
+        assert pruned[1] == full[1], query
+
+
+def test_pruning_narrows_the_candidates():
+    names = case_names(8000)
+    index = matcher.FuzzyNameIndex(names)
+    candidates = index.candidates(matcher.normalize_name(names[0].split(" v.")[0]))
+    assert 0 in candidates
+    assert len(candidates) < len(names) / 2
+
+
+def test_top_respects_ids_and_cutoff():
+    names = ["Roy v. State", "Radha v. Reliance Bank", "Rai v. State", "Kumar v. MetroCorp"]
+    index = matcher.FuzzyNameIndex(names)
+    ids, scores = index.top("Roy", 2, score_cutoff=matcher.FUZZY_THRESHOLD)
+    assert ids == [0] and scores == [100.0]
+    ids, _ = index.top("Roy", 2, ids=np.array([1, 2, 3]))
+    assert 0 not in ids
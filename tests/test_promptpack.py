@@ -0,0 +1,65 @@
+import promptpack
+import pytest
+
+
+def case(i, words):
+    return {"name": f"Party{i} v. State", "charges": "IPC 302", "texts": [" ".join(f"word{i}x{j}." for j in range(words))]}
+
+
+@pytest.mark.parametrize("budget", [600, 1500, 3000])
+def test_prompt_stays_within_budget(budget):
+    cases = [case(i, 2000) for i in range(5)]
+    prompt, count = promptpack.pack_cases("what was the sentence for murder?", cases, budget=budget)
+    assert promptpack.count_tokens(prompt) <= budget
+    assert 1 <= count <= 5
+    assert f"=== CASE {count} ===" in prompt and f"=== CASE {count + 1} ===" not in prompt
+
+
+def test_low_ranked_cases_are_dropped_below_the_minimum():
+    cases = [case(i, 2000) for i in range(10)]
+    prompt, count = promptpack.pack_cases("query", cases, budget=1500, min_case_tokens=200)
+    assert count < 10
+    # the best-ranked cases are the ones kept
+    assert "Party0 v. State" in prompt and "Party9 v. State" not in prompt
+    # every kept case still gets at least the minimum of case text
+    for i in range(count):
+        body = prompt.split(f"=== CASE {i + 1} ===")[1].split("=== CASE")[0]
+        assert promptpack.count_tokens(body) >= 200
+
+
+def test_short_cases_are_kept_whole():
+    cases = [case(0, 10), case(1, 2000)]
+    prompt, count = promptpack.pack_cases("query", cases, budget=1000)
+    assert count == 2
+    assert cases[0]["texts"][0] in prompt
+    assert cases[1]["texts"][0] not in prompt and "…" in prompt
+
+
+def test_trim_to_tokens_cuts_at_a_sentence_or_word():
+    text = "First sentence here. Second sentence is a little longer than the first one."
+    assert promptpack.trim_to_tokens(text, 8) == "First sentence here. …"
+    # the last full stop is too early in the kept text, so the cut falls between words
+    assert promptpack.trim_to_tokens(text, 12) == "First sentence here. Second sentence …"
+    assert promptpack.trim_to_tokens(text, 1000) == text
+
+
+def test_allocate_gives_unused_share_to_the_rest():
+    assert promptpack.allocate([10, 500, 500], 300) == [10, 145, 145]
+    assert sum(promptpack.allocate([100, 100], 1000)) == 200
+
+
+def test_parse_reply_sections():
+    reply = "### CASE 1\nFirst summary.\n### CASE 2\nSecond summary.\n### ANSWER\nThe answer."
+    assert promptpack.parse_reply(reply) == {0: "First summary.", 1: "Second summary.", "answer": "The answer."}
+
+
+def test_parse_reply_with_a_heading_still_streaming_in():
+    assert promptpack.parse_reply("### CASE 1\nFirst summary.\n### CA") == {0: "First summary."}
+    assert promptpack.parse_reply("### CASE 1\nFirst summary.\n### ANSWER") == {0: "First summary.", "answer": ""}
+    assert promptpack.parse_reply("### CASE 1\nFirst sum") == {0: "First sum"}
+
+
+def test_parse_reply_without_headings_is_the_answer():
+    assert promptpack.parse_reply("Just an answer.") == {"answer": "Just an answer."}
+    assert promptpack.parse_reply("") == {}
+    assert promptpack.parse_reply("#") == {}
@@ -0,0 +1,90 @@
+import os
+import pytest
+import ttscache
+
+
+class CountingTTS(ttscache.FakeTTS):
+    def __init__(self):
+        super().__init__(seconds_per_char=0)
+        self.texts = []
+
+    def __call__(self, text, lang, path):
+        self.texts.append(text)
+        super().__call__(text, lang, path)
+
+
+@pytest.fixture
+def tts(tmp_path):
+    cache = ttscache.TTSCache(CountingTTS(), cache_dir=str(tmp_path), chunk_chars=40)
+    yield cache
+    cache.pool.shutdown()
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_miss_synthesizes_each_chunk_and_joins_them(tts):
+    text = "The appeal is allowed. The conviction is set aside. Costs are awarded."
+    path = tts.synthesize(text)
+    assert sorted(tts.synth.texts) == sorted(ttscache.split_sentences(text, 40))
+    assert read(path) == b"".join(b"ID3[en] " + chunk.encode("utf-8") for chunk in ttscache.split_sentences(text, 40))
+
+
+def test_hit_does_not_synthesize_again(tts):
+    text = "The petition is dismissed."
+    first = tts.synthesize(text)
+    second = tts.synthesize(text)
+    assert first == second and tts.synth.texts == [text]
+
+
+def test_language_and_text_are_part_of_the_key(tts):
+    tts.synthesize("Bail is granted.")
+    tts.synthesize("Bail is granted.", lang="hi")
+    tts.synthesize("Bail is refused.")
+    assert len(tts.synth.texts) == 3
+
+
+def test_answers_share_cached_sentences(tts):
+    tts.synthesize("The appeal is allowed. Costs are awarded to the petitioner.")
+    tts.synth.texts.clear()
+    tts.synthesize("The appeal is allowed. No order as to costs.")
+    assert tts.synth.texts == ["No order as to costs."]
+
+
+def test_prefetch_leaves_the_last_chunk(tts):
+    tts.prefetch("The appeal is allowed. The conviction is set aside. Costs are")
+    tts.pool.shutdown(wait=True)
+    assert tts.synth.texts == ["The appeal is allowed."]
+
+
+def test_empty_text_has_no_audio(tts):
+    assert tts.synthesize("   ") is None
+
+
+def test_eviction_drops_least_recently_used(tts):
+    unused = tts.synthesize("First answer.")
+    used = tts.synthesize("Second answer.")
+    os.utime(unused, (1000, 1000))
+    total = sum(os.path.getsize(os.path.join(tts.cache_dir, f)) for f in os.listdir(tts.cache_dir))
+    tts.max_bytes = total - os.path.getsize(unused)
+    assert tts.evict() <= tts.max_bytes
+    assert not os.path.exists(unused) and os.path.exists(used)
+    # a hit refreshes the file, so it outlives files that were used after it
+    for f in os.listdir(tts.cache_dir):
+        os.utime(os.path.join(tts.cache_dir, f), (2000, 2000))
+    os.utime(used, (1000, 1000))
+    assert tts.synthesize("Second answer.") == used
+    tts.max_bytes = os.path.getsize(used)
+    tts.evict()
+    assert os.listdir(tts.cache_dir) == [os.path.basename(used)]
+
+
+def test_stale_temp_files_are_removed(tts):
+    tmp = os.path.join(tts.cache_dir, "answer-x.mp3.1.tmp")
+    with open(tmp, "wb") as f:
+        f.write(b"partial")
+    os.utime(tmp, (0, 0))
+    tts.evict()
+    assert not os.path.exists(tmp)
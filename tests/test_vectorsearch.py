@@ -0,0 +1,75 @@
+from embedindex import EmbeddingIndex
+import numpy as np
+import vectorsearch
+
+
+#unit rows around `clusters` centres, like sentence embeddings of related documents
+def clustered(n, dim=64, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    data = centres[rng.integers(clusters, size=n)] + rng.normal(scale=0.6, size=(n, dim))
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data.astype(np.float32)
+
+
+def queries(data, count=100, seed=1):
+    rng = np.random.default_rng(seed)
+    sample = data[rng.choice(len(data), count, replace=False)] + rng.normal(scale=0.3, size=(count, data.shape[1]))
+    return (sample / np.linalg.norm(sample, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_exact_search_matches_full_sort():
+    data = clustered(2000)
+    query = queries(data, 1)[0]
+    indices, scores = vectorsearch.ExactSearch(data).search(query, 10)
+    expected = np.argsort(-(data @ query))[:10]
+    assert indices.tolist() == expected.tolist()
+    assert np.allclose(scores, (data @ query)[expected])
+
+
+def test_ivf_scanning_every_list_is_exact():
+    data = clustered(3000)
+    ivf = vectorsearch.IVFSearch(data, target_recall=0)
+    exact = vectorsearch.ExactSearch(data)
+    for query in queries(data, 20):
+        assert set(ivf.search(query, 10, nprobe=ivf.n_lists)[0].tolist()) == set(exact.search(query, 10)[0].tolist())
+
+
+def test_ivf_is_tuned_to_the_recall_target():
+    data = clustered(10000)
+    exact = vectorsearch.ExactSearch(data)
+    untuned = vectorsearch.IVFSearch(data, nprobe=1, target_recall=0)
+    tuned = vectorsearch.IVFSearch(data, nprobe=1, target_recall=0.95)
+    assert tuned.recall >= 0.95
+    assert tuned.nprobe > untuned.nprobe
+    # held-out queries land close to the calibration estimate
+    held_out = queries(data)
+    assert vectorsearch.recall_at_k(tuned, exact, held_out, 10) >= 0.9
+    assert vectorsearch.recall_at_k(tuned, exact, held_out, 10) > vectorsearch.recall_at_k(untuned, exact, held_out, 10)
+
+
+def test_auto_backend_keeps_small_indexes_exact():
+    assert isinstance(vectorsearch.make_searcher(clustered(500), "auto"), vectorsearch.ExactSearch)
+    assert isinstance(vectorsearch.make_searcher(clustered(500), "ivf"), vectorsearch.IVFSearch)
+
+
+class HashEmbedder:
+    model_name = "hash-test"
+
+    def encode(self, texts):
+        return np.stack([np.random.default_rng(sum(map(ord, text))).normal(size=16) for text in texts])
+
+
+def test_index_builds_searcher_on_update_and_load(tmp_path):
+    texts = [f"case {i}" for i in range(50)]
+    index = EmbeddingIndex("test", HashEmbedder(), cache_dir=str(tmp_path))
+    index.update(texts, "v1")
+    assert index.searcher is not None
+    assert index.search("case 7", 1)[0].tolist() == [7]
+
+    index.update(texts[:10], "v2")
+    assert len(index.searcher.vectors) == 10
+
+    reloaded = EmbeddingIndex("test", HashEmbedder(), cache_dir=str(tmp_path))
+    assert reloaded.version == "v2" and reloaded.searcher is not None
+    assert reloaded.search("case 3", 1)[0].tolist() == [3]
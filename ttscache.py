@@ -0,0 +1,175 @@
+from casestore import CACHE_DIR
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import metrics
+import os
+import re
+import threading
+import time
+
+# Text-to-speech through a content-addressed, size-bounded cache of MP3 files.
+# Long answers are cut into sentence chunks that are synthesized side by side (and
+# cached one by one) and then concatenated; MP3 frames can simply be appended.
+
+TTS_CACHE_DIR = os.getenv("LAWFIRM_TTS_CACHE", os.path.join(CACHE_DIR, "tts"))
+TTS_CACHE_BYTES = int(os.getenv("LAWFIRM_TTS_CACHE_MB", "200")) * 1024 * 1024
+TTS_WORKERS = int(os.getenv("LAWFIRM_TTS_WORKERS", "4"))
+TTS_CHUNK_CHARS = int(os.getenv("LAWFIRM_TTS_CHUNK_CHARS", "400"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+#sentences packed greedily into chunks of at most max_chars (a longer sentence is its own chunk)
+def split_sentences(text, max_chars=TTS_CHUNK_CHARS):
+    chunks = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def gtts_synth(text, lang, path):
+    from gtts import gTTS
+
+    gTTS(text=text, lang=lang).save(path)
+
+
+class FakeTTS:
+    """Offline gTTS stand-in: waits `seconds_per_char` per character and writes
+    placeholder bytes, so the cache and worker pool can be exercised without network.
+    """
+
+    def __init__(self, seconds_per_char=None):
+        if seconds_per_char is None:
+            seconds_per_char = float(os.getenv("LAWFIRM_FAKE_TTS_LATENCY", "0.0005"))
+        self.seconds_per_char = seconds_per_char
+
+    def __call__(self, text, lang, path):
+        time.sleep(len(text) * self.seconds_per_char)
+        with open(path, "wb") as f:
+            f.write(b"ID3" + f"[{lang}] {text}".encode("utf-8"))
+
+
+def enabled():
+    return os.getenv("LAWFIRM_FAKE_TTS", "").lower() in ("1", "true", "yes")
+
+
+class TTSCache:
+    """`synth(text, lang, path)` writes one audio file; this class decides when to call it."""
+
+    def __init__(self, synth=None, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_BYTES, workers=TTS_WORKERS,
+                 chunk_chars=TTS_CHUNK_CHARS):
+        self.synth = synth or (FakeTTS() if enabled() else gtts_synth)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.chunk_chars = chunk_chars
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.lock = threading.Lock()
+        self.pending = {}  # chunk path -> Future, so a chunk is never synthesized twice at once
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, text, lang="en", kind="answer"):
+        digest = hashlib.sha1(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{kind}-{digest}.mp3")
+
+    def _chunk(self, text, lang, path):
+        if not os.path.exists(path):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            self.synth(text, lang, tmp)
+            os.replace(tmp, path)
+        else:
+            os.utime(path)
+        return path
+
+    def _submit(self, text, lang):
+        path = self.path_for(text, lang, "chunk")
+        with self.lock:
+            future = self.pending.get(path)
+            if future is not None:
+                return future
+            future = self.pending[path] = self.pool.submit(self._chunk, text, lang, path)
+        # outside the lock: on a future that is already done the callback runs right here
+        future.add_done_callback(lambda _: self._forget(path))
+        return future
+
+    def _forget(self, path):
+        with self.lock:
+            self.pending.pop(path, None)
+
+    #start on the finished sentences of an answer that is still streaming in
+    def prefetch(self, text, lang="en"):
+        chunks = split_sentences(text, self.chunk_chars)
+        # the last chunk may still grow; everything before it is final
+        for chunk in chunks[:-1]:
+            if not os.path.exists(self.path_for(chunk, lang, "chunk")):
+                self._submit(chunk, lang)
+
+    #path of an MP3 for `text`, synthesized (in parallel chunks) unless it is cached
+    def synthesize(self, text, lang="en"):
+        if not text or not text.strip():
+            return None
+        path = self.path_for(text, lang)
+        if os.path.exists(path):
+            metrics.inc("lawfirm_cache_hits_total", cache="tts")
+            os.utime(path)  # mark as recently used for eviction
+            return path
+        metrics.inc("lawfirm_cache_misses_total", cache="tts")
+
+        futures = [self._submit(chunk, lang) for chunk in split_sentences(text, self.chunk_chars)]
+        parts = [future.result() for future in futures]
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    out.write(f.read())
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    #drop least recently used files until the folder fits in max_bytes, plus stale temp files
+    def evict(self):
+        files = []
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".tmp"):
+                if now - st.st_mtime > 3600:
+                    self._remove(entry.path)
+                continue
+            files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+        return total
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        return _cache
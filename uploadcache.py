@@ -0,0 +1,74 @@
+from casestore import file_digest
+from collections import OrderedDict
+import metrics
+import numpy as np
+import os
+import sys
+import threading
+
+# Upper bound on what parsed uploads and their embeddings may hold in memory
+UPLOAD_CACHE_BYTES = int(os.getenv("LAWFIRM_UPLOAD_CACHE_MB", "256")) * 1024 * 1024
+
+
+#rough in-memory size of parsed cases, name lists and embedding arrays
+def estimate_bytes(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_bytes(item) for item in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + estimate_bytes(vars(obj))
+    return sys.getsizeof(obj)
+
+
+class UploadCache:
+    """LRU of whatever `build(file_path)` returns, keyed by the uploaded file's
+    content hash, so the same document uploaded again (under any temp name) is
+    parsed and embedded only once.
+    """
+
+    def __init__(self, build, max_bytes=UPLOAD_CACHE_BYTES):
+        self.build = build
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.digests = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, file_path):
+        st = os.stat(file_path)
+        stamp = (file_path, st.st_mtime_ns, st.st_size)
+        if stamp not in self.digests:
+            if len(self.digests) > 1024:
+                self.digests.clear()
+            self.digests[stamp] = file_digest(file_path)
+        return self.digests[stamp]
+
+    def get(self, file_path):
+        key = self.digest(file_path)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc("lawfirm_cache_hits_total", cache="upload")
+                return self.entries[key]
+            self.misses += 1
+            metrics.inc("lawfirm_cache_misses_total", cache="upload")
+
+        value = self.build(file_path)
+        size = estimate_bytes(value)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = value
+                self.sizes[key] = size
+                self.total_bytes += size
+            # evict least recently used uploads, but always keep the one just built
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, _ = self.entries.popitem(last=False)
+                self.total_bytes -= self.sizes.pop(old_key)
+        return value
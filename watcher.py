@@ -0,0 +1,129 @@
+import casestore
+import chunker
+import embedindex
+import facets
+import lexical
+import matcher
+import metrics
+import os
+import threading
+import time
+
+# How often the case folder is polled when watchdog (inotify & co.) is not installed
+POLL_INTERVAL = float(os.getenv("LAWFIRM_POLL_INTERVAL", "2"))
+
+
+class Snapshot:
+    """Everything a search needs, built together for one corpus version and never
+    modified afterwards, so a search that holds it sees a consistent view.
+    """
+
+    def __init__(self, cases, version, name_index, fuzzy_names, chunk_index=None, lexical_index=None, facet_index=None):
+        self.cases = cases
+        self.version = version
+        self.client_names = [case.get("client", "") for case in cases]
+        self.name_index = name_index
+        self.fuzzy_names = fuzzy_names
+        self.chunk_index = chunk_index
+        self.lexical_index = lexical_index
+        self.facets = facet_index or facets.FacetIndex(cases)
+
+
+def build_snapshot(store, embedder, with_chunks=True):
+    cases = list(store.cases)
+    version = store.version
+    client_names = [case.get("client", "") for case in cases]
+    # fresh index objects reuse the on-disk vectors by text hash, so only changed texts are encoded
+    # index files are per folder, so apps watching different folders don't overwrite each other's
+    name_index = embedindex.EmbeddingIndex(f"client_names-{store.key}", embedder)
+    name_index.update(client_names, version)
+    chunk_index = lexical_index = None
+    if with_chunks:
+        chunk_index = chunker.ChunkIndex(f"case_chunks-{store.key}", embedder)
+        chunk_index.update(cases, version)
+        lexical_index = lexical.CaseLexicalIndex(cases)
+    return Snapshot(cases, version, name_index, matcher.FuzzyNameIndex(client_names), chunk_index, lexical_index)
+
+
+class CaseWatcher:
+    """Keeps a Snapshot of a case folder up to date from a background thread.
+
+    Uses watchdog for file-system events when it is installed and falls back to
+    polling the folder otherwise. Searches call current() and never wait on a rebuild.
+    """
+
+    def __init__(self, folder_path, embedder, with_chunks=True, interval=POLL_INTERVAL):
+        self.store = casestore.get_store(folder_path)
+        self.embedder = embedder
+        self.with_chunks = with_chunks
+        self.interval = interval
+        self.snapshot = None
+        self.changed = threading.Event()
+        self.seen = None
+        self.observer = None
+
+    def current(self):
+        return self.snapshot
+
+    def rebuild(self):
+        self.store.refresh()
+        if self.snapshot is None or self.snapshot.version != self.store.version:
+            # one reference assignment: readers get either the old or the new snapshot
+            start = time.perf_counter()
+            self.snapshot = build_snapshot(self.store, self.embedder, self.with_chunks)
+            metrics.observe("lawfirm_index_build_seconds", time.perf_counter() - start)
+            print(f"✅ Loaded {len(self.snapshot.cases)} cases from {self.store.folder_path}")
+
+    def start(self):
+        try:
+            self.seen = self.store.scan()
+            self.rebuild()
+        except OSError as e:
+            # searches report "no cases" until the folder shows up
+            print(f"Case watcher: cannot read {self.store.folder_path} ({e})")
+        self._watch_events()
+        threading.Thread(target=self._run, name="case-watcher", daemon=True).start()
+        return self
+
+    def _watch_events(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [getattr(event, "src_path", ""), getattr(event, "dest_path", "")]
+                if any(casestore.is_case_file(os.path.basename(path)) for path in paths if path):
+                    watcher.changed.set()
+
+        try:
+            observer = Observer()
+            observer.schedule(Handler(), self.store.folder_path, recursive=False)
+            observer.daemon = True
+            observer.start()
+            self.observer = observer
+        except OSError:
+            pass  # polling still covers the folder
+
+    def _run(self):
+        last_error = None
+        while True:
+            # with watchdog running this wakes on events; the timeout doubles as the polling fallback
+            self.changed.wait(self.interval)
+            self.changed.clear()
+            try:
+                if self.store.scan() != self.seen:
+                    # let a burst of writes (e.g. a file still being copied) settle first
+                    time.sleep(0.2)
+                    seen = self.store.scan()
+                    self.rebuild()
+                    self.seen = seen
+                last_error = None
+            except Exception as e:
+                if str(e) != last_error:
+                    print(f"Case watcher: rebuild failed, keeping the previous snapshot ({e})")
+                last_error = str(e)